@@ -0,0 +1,202 @@
+"""
+Section-level cutoff sensitivity and curve what-ifs.
+
+    python analytics.py roster.csv --curves 0:10:0.05 --shifts 0,1,2 -o sensitivity.csv
+
+Cutoffs "may be adjusted lower but will not be set higher", so instructors
+choosing a curve want to know how many students change letter grade for every
+candidate curve and cutoff shift. A student's final percentage with a curve of
+c points is points / weight + c / weight (the page's (points + c) / weight), so
+a curve moves students with different completed weight by different amounts.
+SectionIndex groups the section by completed weight (only a handful of distinct
+values, such as full weight and full weight minus a dropped midterm) and keeps
+each group's percentages sorted. Whether a student reaches cutoff m at curve c
+with the cutoffs lowered by s is then percentage >= m - s - c / weight, so every
+count is a binary search per group: O(log N) per query after one sort, and a
+sweep of hundreds of curves is a single vectorized np.searchsorted.
+
+The input can be a CSV/JSONL export or a binary gradebook file (gradefile.py).
+"""
+
+import argparse
+import csv
+import sys
+import time
+
+import numpy as np
+
+from gradebook import detect_format, load_roster, read_records
+from schemes import DEFAULT_SCHEME, get_scheme
+from vectorized import accumulate_matrix, to_matrix
+
+# Letter for students below the lowest cutoff, as in the page's cutoff list
+FAIL_GRADE = 'F'
+
+# Most values one sweep of curves, shifts or targets may list
+MAX_SWEEP_VALUES = 10_000
+
+
+class SectionIndex:
+    def __init__(self, points, total_weight, scheme=None):
+        scheme = scheme or DEFAULT_SCHEME
+        points = np.asarray(points, dtype=float)
+        total_weight = np.asarray(total_weight, dtype=float)
+        graded = total_weight > 0
+        # Students with nothing graded yet have no percentage to curve
+        self.ungraded = int(np.count_nonzero(~graded))
+        self.size = int(np.count_nonzero(graded))
+        self.cutoffs = scheme.cutoffs
+        self.grades = tuple(c.grade for c in self.cutoffs) + (FAIL_GRADE,)
+
+        weights = total_weight[graded]
+        percentages = points[graded] / weights
+        self.groups = [(weight, np.sort(percentages[weights == weight])) for weight in np.unique(weights).tolist()]
+
+    @classmethod
+    def from_matrix(cls, scores, has_grade, drop_midterm1_if_lower=False, scheme=None):
+        points, total_weight, _ = accumulate_matrix(scores, has_grade, drop_midterm1_if_lower, scheme)
+        return cls(points, total_weight, scheme)
+
+    @classmethod
+    def from_records(cls, records, drop_midterm1_if_lower=False, scheme=None):
+        """Index raw gradebook records (see gradebook.read_records)."""
+        roster = load_roster(records, scheme, keep_ids=False)
+        return cls.from_matrix(*to_matrix(roster, roster.scheme), drop_midterm1_if_lower, roster.scheme)
+
+    @classmethod
+    def from_gradefile(cls, gradefile, drop_midterm1_if_lower=False, scheme=None, chunk_size=1_000_000):
+        """Index a binary gradebook file, a chunk of students at a time."""
+        scheme = scheme or gradefile.scheme
+        points, weights = [], []
+        for start in range(0, len(gradefile), chunk_size):
+            chunk_points, chunk_weight, _ = accumulate_matrix(*gradefile.matrix(start, start + chunk_size),
+                                                              drop_midterm1_if_lower, scheme)
+            points.append(chunk_points)
+            weights.append(chunk_weight)
+        return cls(np.concatenate(points or [np.zeros(0)]), np.concatenate(weights or [np.zeros(0)]), scheme)
+
+    def count_at_least(self, threshold, curve_points=0.0):
+        """Students whose final percentage with the curve is at least threshold."""
+        return sum(len(ordered) - int(np.searchsorted(ordered, threshold - curve_points / weight))
+                   for weight, ordered in self.groups)
+
+    def grade_counts(self, curve_points=0.0, cutoff_shift=0.0):
+        """Students per letter grade with the curve applied and every cutoff lowered by cutoff_shift."""
+        row = self.sensitivity([curve_points], [cutoff_shift])[0]
+        return {grade: row[grade] for grade in self.grades}
+
+    def crossings(self, curve_points, cutoff_shift=0.0):
+        """For each cutoff, the students who reach it with the curve and shift but not without."""
+        return {
+            cutoff.grade: self.count_at_least(cutoff.min - cutoff_shift, curve_points) - self.count_at_least(cutoff.min)
+            for cutoff in self.cutoffs
+        }
+
+    def sensitivity(self, curves, shifts=(0.0,)):
+        """
+        One row per (shift, curve) pair: students per letter grade and how many
+        changed letter compared with no curve and the published cutoffs.
+        """
+        curves = np.asarray(curves, dtype=float)
+        minimums = np.array([c.min for c in self.cutoffs])
+        rows = []
+        for shift in shifts:
+            lowered = minimums - shift
+            highs = np.concatenate([[np.inf], lowered])
+            lows = np.concatenate([minimums, [-np.inf]])
+            at_least = np.zeros((len(curves), len(minimums)), dtype=np.int64)
+            unchanged = np.zeros(len(curves), dtype=np.int64)
+            for weight, ordered in self.groups:
+                moved = (curves / weight)[:, None]
+                at_least += len(ordered) - np.searchsorted(ordered, lowered[None, :] - moved)
+
+                # Students who stay in their published letter band [low, high)
+                # are the ones still below the next (lowered) cutoff after the curve
+                top = np.maximum(highs[None, :] - moved, lows[None, :])
+                unchanged += (np.searchsorted(ordered, top) - np.searchsorted(ordered, lows)[None, :]).sum(axis=1)
+
+            counts = np.diff(np.concatenate([np.zeros((len(curves), 1), dtype=np.int64), at_least,
+                                             np.full((len(curves), 1), self.size)], axis=1), axis=1)
+            for q, curve in enumerate(curves.tolist()):
+                row = {'curve': curve, 'shift': float(shift)}
+                row.update(zip(self.grades, counts[q].tolist()))
+                row['changed'] = self.size - int(unchanged[q])
+                rows.append(row)
+        return rows
+
+
+def _number(text):
+    try:
+        return float(text)
+    except ValueError:
+        raise ValueError(f"{text.strip()!r} is not a number") from None
+
+
+def parse_sweep(text, limit=MAX_SWEEP_VALUES):
+    """
+    '0:10:0.5' (start:stop:step, stop included) or a comma-separated list.
+    Sweeps of more than limit values are rejected before any are generated.
+    """
+    if ':' in text:
+        parts = text.split(':')
+        if len(parts) != 3:
+            raise ValueError("A sweep range is start:stop:step")
+        start, stop, step = (_number(part) for part in parts)
+        if not np.isfinite([start, stop, step]).all():
+            raise ValueError("Sweep bounds and step must be finite")
+        if step <= 0:
+            raise ValueError(f"Sweep step must be positive, got {step:g}")
+        # np.arange's own length for the range below, without allocating it
+        count = max(0, int(np.ceil((stop + step / 2 - start) / step)))
+        if count > limit:
+            raise ValueError(f"Sweep {text.strip()} has {count:,} values; at most {limit:,} are allowed")
+        return np.round(np.arange(start, stop + step / 2, step), 10).tolist()
+    parts = text.split(',')
+    if len(parts) > limit:
+        raise ValueError(f"Sweep has {len(parts):,} values; at most {limit:,} are allowed")
+    values = [_number(part) for part in parts]
+    if not np.isfinite(values).all():
+        raise ValueError("Sweep values must be finite")
+    return values
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Letter grade counts for a sweep of curves and cutoff shifts.")
+    parser.add_argument('input', help="gradebook export (CSV or JSONL) or binary gradebook file (.grades)")
+    parser.add_argument('-o', '--output', default='-', help="CSV table, or - for stdout (default)")
+    parser.add_argument('--input-format', choices=('csv', 'jsonl'), help="defaults to the input file extension")
+    parser.add_argument('--curves', default='0:10:0.5', help="curve points as start:stop:step or a list (default 0:10:0.5)")
+    parser.add_argument('--shifts', default='0', help="points every cutoff is lowered by, same format (default 0)")
+    parser.add_argument('--drop-mid1', action='store_true', help="apply the scheme's optional drop rules")
+    parser.add_argument('--scheme', help="grading scheme id or scheme file (default: the syllabus course)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.input.endswith('.grades'):
+        from gradefile import GradeFile
+
+        with GradeFile(args.input) as gradefile:
+            scheme = get_scheme(args.scheme) if args.scheme else gradefile.scheme
+            index = SectionIndex.from_gradefile(gradefile, args.drop_mid1, scheme)
+    else:
+        with open(args.input, newline='', encoding='utf-8') as source:
+            index = SectionIndex.from_records(read_records(source, args.input_format or detect_format(args.input)),
+                                              args.drop_mid1, get_scheme(args.scheme))
+    loaded = time.perf_counter()
+    rows = index.sensitivity(parse_sweep(args.curves), parse_sweep(args.shifts))
+    swept = time.perf_counter()
+
+    sink = sys.stdout if args.output == '-' else open(args.output, 'w', newline='', encoding='utf-8')
+    try:
+        writer = csv.DictWriter(sink, fieldnames=['shift', 'curve', *index.grades, 'changed'])
+        writer.writeheader()
+        writer.writerows(rows)
+    finally:
+        if sink is not sys.stdout:
+            sink.close()
+    print(f"Indexed {index.size} students in {loaded - start:.2f}s ({index.ungraded} with no grades skipped); "
+          f"{len(rows)} scenarios in {(swept - loaded) * 1000:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
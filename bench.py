@@ -0,0 +1,291 @@
+"""
+Standalone benchmarks for the grading engine.
+
+    python bench.py                   # run the suite, compare with bench_baseline.json
+    python bench.py --save-baseline   # run the suite and store it as the new baseline
+    python bench.py --scaling         # loop vs NumPy and worker-count scaling tables
+    python bench.py --history         # latest-snapshot lookups in a history database of 1M snapshots
+
+The suite measures single-student calculate_grade latency, roster throughput at
+1k/100k/1M students, prediction latency over a target x curve grid and a
+headless script run of calculator.py. Results are written to JSON; any metric
+more than --tolerance worse than the baseline is reported and the exit status
+is 1. The page runs, much noisier than the rest, allow APP_TOLERANCE.
+Baselines are machine-specific, so none is committed: save one on the machine
+you compare on. Until then the exit status is 2, never a silent pass.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from grading import COMPONENTS, CUTOFFS, calculate_grade, calculate_grades_batch
+from history import HistoryStore
+from parallel import required_average_grids_parallel
+from prediction import predict
+from records import Roster
+from samples import random_roster, to_rows
+from vectorized import calculate_grades_vectorized, required_average_grids
+
+HERE = Path(__file__).parent
+BASELINE_FILE = HERE / 'bench_baseline.json'
+RESULTS_FILE = HERE / 'bench_results.json'
+
+# A metric regresses when it is this much worse than the baseline
+DEFAULT_TOLERANCE = 0.25
+
+# Page runs of ~30 ms share the CPU with Streamlit's script thread and swing by
+# a third between runs even as medians, so they only fail on larger slowdowns
+APP_TOLERANCE = 0.5
+
+ROSTER_SIZES = (1_000, 100_000, 1_000_000)
+GRID_TARGETS = tuple(range(0, 101, 5))
+GRID_CURVES = tuple(c / 2 for c in range(0, 21))
+
+SAMPLE_STUDENT = {
+    'homework': (92.5, True), 'discussion': (88.0, True),
+    'mid1': (71.0, True), 'mid2': (84.0, True),
+    'mid3': (0.0, False), 'final': (0.0, False)
+}
+
+
+def best_of(func, repeat=3):
+    """Fastest wall time of repeat calls to func, in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def median_of(func, repeat=5):
+    """Median wall time of repeat calls to func, in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def bench_vectorized(sizes=(10_000, 100_000, 1_000_000)):
+    """Compare the per-student batch loop with the NumPy path at each roster size."""
+    print(f"{'students':>10} {'loop (s)':>10} {'numpy (s)':>10} {'speedup':>8}")
+    for n in sizes:
+        scores, has_grade = random_roster(n)
+        rows = to_rows(scores, has_grade)
+        loop = best_of(lambda rows=rows: calculate_grades_batch(rows, drop_midterm1_if_lower=True))
+        vec = best_of(lambda: calculate_grades_vectorized(scores, has_grade, drop_midterm1_if_lower=True))
+        print(f"{n:>10} {loop:>10.4f} {vec:>10.4f} {loop / vec:>7.1f}x")
+        del rows
+
+
+def bench_parallel(n=1_000_000, workers=None, curves=GRID_CURVES):
+    """
+    Scaling curve of the cutoff x curve prediction grid across process pool
+    sizes, against the same NumPy work in this process. The 1-worker overhead
+    (pool start, shared memory copies) is the serial part that bounds the speedup.
+    """
+    if workers is None:
+        cpus = os.cpu_count()
+        workers = sorted({1, *(2 ** i for i in range(cpus.bit_length()) if 2 ** i <= cpus), cpus})
+    scores, has_grade = random_roster(n)
+    targets = tuple(CUTOFFS.values())
+    serial = best_of(lambda: required_average_grids(scores, has_grade, targets, curves, True))
+    print(f"{n} students x {len(targets) * len(curves)} scenarios, one process: {serial:.3f}s")
+    print(f"{'workers':>8} {'time (s)':>10} {'speedup':>8} {'efficiency':>10}")
+    for count in workers:
+        elapsed = best_of(lambda: required_average_grids_parallel((scores, has_grade), targets, curves, True,
+                                                                  workers=count))
+        print(f"{count:>8} {elapsed:>10.3f} {serial / elapsed:>7.2f}x {serial / elapsed / count:>9.0%}")
+
+
+def bench_memory(n=1_000_000):
+    """Memory held by n students as component dictionaries and as a Roster, measured with tracemalloc."""
+    scores, has_grade = random_roster(n)
+    scores, has_grade = scores.tolist(), has_grade.tolist()
+
+    def traced(build):
+        tracemalloc.start()
+        value = build()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return value, size
+
+    rows, dict_bytes = traced(lambda: [dict(zip(COMPONENTS, zip(s, h))) for s, h in zip(scores, has_grade)])
+    roster, roster_bytes = traced(lambda rows=rows: Roster.from_rows(rows))
+    del rows
+    print(f"{'students':>10} {'dicts (MB)':>11} {'Roster (MB)':>12} {'saving':>7}")
+    print(f"{n:>10} {dict_bytes / 2 ** 20:>11.1f} {roster_bytes / 2 ** 20:>12.1f} {dict_bytes / roster_bytes:>6.1f}x")
+    return dict_bytes, roster_bytes
+
+
+def bench_history(snapshots=1_000_000, students=100_000, lookups=10_000):
+    """Import snapshots into a fresh history database, then time latest-snapshot lookups for random students."""
+    scores, has_grade = random_roster(snapshots)
+    scores, has_grade = scores.tolist(), has_grade.tolist()
+    records = (
+        {'student_id': f"s{i % students}", **{key: score if graded else '' for key, score, graded in zip(COMPONENTS, s, h)}}
+        for i, (s, h) in enumerate(zip(scores, has_grade))
+    )
+    with tempfile.TemporaryDirectory() as tmp, HistoryStore(Path(tmp) / 'history.db') as store:
+        start = time.perf_counter()
+        store.import_records(records, 80.0)
+        imported = time.perf_counter() - start
+
+        ids = [f"s{random.randrange(students)}" for _ in range(lookups)]
+        start = time.perf_counter()
+        for student_id in ids:
+            store.latest(student_id, 'default')
+        lookup = (time.perf_counter() - start) / lookups
+        print(f"{'snapshots':>10} {'import (s)':>11} {'latest (us)':>12}")
+        print(f"{store.count():>10} {imported:>11.1f} {lookup * 1e6:>12.1f}")
+    return imported, lookup
+
+
+def metric(value, unit, higher_is_better=False, tolerance=None):
+    """A result; tolerance widens the suite's --tolerance for noisy metrics."""
+    return {'value': value, 'unit': unit, 'higher_is_better': higher_is_better, 'tolerance': tolerance}
+
+
+def bench_single(calls=20_000, repeat=5):
+    """Latency of one calculate_grade call for a partly graded student."""
+    def run():
+        for _ in range(calls):
+            calculate_grade(SAMPLE_STUDENT, True)
+    return {'calculate_grade_latency': metric(best_of(run, repeat) / calls * 1e6, 'us')}
+
+
+def bench_roster(sizes=ROSTER_SIZES, repeat=3):
+    """Students graded per second by the NumPy path at each roster size."""
+    results = {}
+    for n in sizes:
+        scores, has_grade = random_roster(n)
+        elapsed = best_of(lambda: calculate_grades_vectorized(scores, has_grade, drop_midterm1_if_lower=True), repeat)
+        results[f'roster_{n}_throughput'] = metric(n / elapsed, 'students/s', higher_is_better=True)
+    return results
+
+
+def bench_prediction_grid(targets=GRID_TARGETS, curves=GRID_CURVES, repeat=3):
+    """Mean latency of an uncached prediction over every target x curve pair."""
+    def run():
+        for target in targets:
+            for curve in curves:
+                predict(SAMPLE_STUDENT, True, target, curve)
+    count = len(targets) * len(curves)
+    return {'prediction_grid_latency': metric(best_of(run, repeat) / count * 1e6, 'us')}
+
+
+def bench_app(sessions=7, reruns=31):
+    """
+    Headless script runs of the page: the median first run of a new session and
+    the median rerun with nothing changed.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    script = str(HERE / 'calculator.py')
+    AppTest.from_file(script).run()  # the first run in the process pays for the cold imports
+    apps = iter([AppTest.from_file(script) for _ in range(sessions)])
+    first = median_of(lambda: next(apps).run(), repeat=sessions)
+    app = AppTest.from_file(script).run()
+    rerun = median_of(app.run, repeat=reruns)
+    return {
+        'app_first_run': metric(first * 1000, 'ms', tolerance=APP_TOLERANCE),
+        'app_rerun': metric(rerun * 1000, 'ms', tolerance=APP_TOLERANCE),
+    }
+
+
+def run_suite(sizes=ROSTER_SIZES):
+    metrics = {}
+    for name, bench in (('single', bench_single), ('roster', lambda: bench_roster(sizes)),
+                        ('prediction grid', bench_prediction_grid), ('app', bench_app)):
+        print(f"running {name}...", file=sys.stderr)
+        metrics.update(bench())
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'machine': {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'metrics': metrics,
+    }
+
+
+def compare(metrics, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Names and messages of the metrics more than tolerance worse than the baseline."""
+    regressions = []
+    for name, old in baseline.items():
+        if name not in metrics:
+            continue
+        new = metrics[name]['value']
+        change = (old['value'] - new) / old['value'] if old['higher_is_better'] else (new - old['value']) / old['value']
+        if change > max(tolerance, metrics[name].get('tolerance') or 0):
+            regressions.append((name, f"{name}: {new:.4g} {old['unit']} vs baseline {old['value']:.4g} ({change:+.0%} worse)"))
+    return regressions
+
+
+def print_table(metrics, baseline):
+    print(f"{'metric':<32} {'value':>14} {'baseline':>14} {'unit':<12}")
+    for name, m in metrics.items():
+        old = f"{baseline[name]['value']:.4g}" if name in baseline else "-"
+        print(f"{name:<32} {m['value']:>14.4g} {old:>14} {m['unit']:<12}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the grading, prediction and render paths.")
+    parser.add_argument('-o', '--output', default=str(RESULTS_FILE), help="JSON results file")
+    parser.add_argument('--baseline', default=str(BASELINE_FILE), help="JSON baseline to compare with")
+    parser.add_argument('--save-baseline', action='store_true', help="store this run as the baseline instead of comparing")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown before a metric counts as a regression (0.25 = 25%%)")
+    parser.add_argument('--quick', action='store_true', help="skip the 1M student roster")
+    parser.add_argument('--scaling', action='store_true', help="print the loop vs NumPy and worker scaling tables instead")
+    parser.add_argument('--memory', action='store_true', help="print the memory of 1M students as dicts and as a Roster instead")
+    parser.add_argument('--history', action='store_true', help="print the history import time and lookup latency instead")
+    args = parser.parse_args(argv)
+
+    if args.scaling:
+        bench_vectorized()
+        bench_parallel()
+        return 0
+    if args.memory:
+        bench_memory()
+        return 0
+    if args.history:
+        bench_history()
+        return 0
+
+    results = run_suite(ROSTER_SIZES[:-1] if args.quick else ROSTER_SIZES)
+    Path(args.output).write_text(json.dumps(results, indent=2) + "\n")
+
+    if args.save_baseline:
+        Path(args.baseline).write_text(json.dumps(results, indent=2) + "\n")
+        print_table(results['metrics'], {})
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    if not Path(args.baseline).is_file():
+        # Nothing to compare with must not pass as "no regressions"
+        print_table(results['metrics'], {})
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one", file=sys.stderr)
+        return 2
+    baseline = json.loads(Path(args.baseline).read_text())['metrics']
+    print_table(results['metrics'], baseline)
+
+    regressions = compare(results['metrics'], baseline, args.tolerance)
+    if regressions:
+        print(f"\nPERFORMANCE REGRESSION: {len(regressions)} metric(s) beyond {args.tolerance:.0%} of the baseline", file=sys.stderr)
+        for _, message in regressions:
+            print(f"  {message}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
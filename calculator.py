@@ -1,5 +1,15 @@
+import time
+
+run_started = time.perf_counter()
+
 import streamlit as st
 
+from derived import PAGE_GRAPH
+from page_assets import PAGE_CSS, cutoffs_markdown
+from prediction import cache_stats
+from schemes import DEFAULT_SCHEME, DEFAULT_SCHEME_ID, available_schemes, scheme_errors
+from timing import TRACE_FILE, chrome_trace, finish_run, start_run, timing_enabled, write_chrome_trace
+
 # Theme configuration
 st.set_page_config(
     page_title="Grade Calculator",
@@ -8,196 +18,236 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Apply dark theme
-st.markdown("""
-<style>
-    .stApp {
-        background-color: #1E1E1E;
-    }
-    .stNumberInput, .stTextInput, .stSelectbox {
-        background-color: #2E2E2E;
-    }
-    /* Text colors */
-    .stMarkdown, .stText, .stTitle, .stSubheader, .stNumberInput label, 
-    .stTextInput label, .stSelectbox label, .stRadio label, .stCheckbox label {
-        color: #FFFFFF !important;
-    }
-    /* Input text colors */
-    .stNumberInput input, .stTextInput input {
-        color: #FFFFFF !important;
-    }
-    /* Checkbox and radio colors */
-    .stCheckbox .stCheckbox, .stRadio .stRadio {
-        color: #FFFFFF !important;
-    }
-    /* Sidebar colors */
-    .css-1d391kg, .css-1v0mbdj {
-        background-color: #1E1E1E !important;
-    }
-</style>
-""", unsafe_allow_html=True)
+# Stage timing, on with GRADE_CALC_TIMING=1 or ?timing=1; a no-op otherwise
+trace = start_run(timing_enabled() or st.query_params.get('timing') in ('1', 'true'), started=run_started)
+trace.add_span("imports", run_started, time.perf_counter())
 
-st.title("Grade Calculator")
+with trace.span("page setup"):
+    # Apply dark theme
+    st.markdown(PAGE_CSS, unsafe_allow_html=True)
+
+    st.title("Grade Calculator")
+
+    # Pick the course when more than one grading scheme is installed
+    schemes = available_schemes()
+    for file_name, error in scheme_errors().items():
+        st.sidebar.warning(f"Skipped course file {file_name}: {error}")
+    if len(schemes) > 1:
+        scheme_id = st.sidebar.selectbox("Course", list(schemes), index=list(schemes).index(DEFAULT_SCHEME_ID),
+                                         format_func=lambda scheme_id: schemes[scheme_id].name)
+        scheme = schemes[scheme_id]
+    else:
+        scheme = DEFAULT_SCHEME
 
-st.markdown("""
-This app calculates your overall grade based on the following weighted components:
-- Homework: **5%**
-- Discussion Engagement: **10%**
-- Three Midterm Exams: **20%** each (total **60%**)
-- Final Exam: **25%**
-""")
+    # Every keyed input takes its default from the session state, so a loaded snapshot can override it
+    defaults = {f"{scheme.id}:target": 80.0, f"{scheme.id}:rules": False, f"{scheme.id}:curve": 0.0,
+                f"{scheme.id}:section": ''}
+    for c in scheme.components:
+        defaults[f"{scheme.id}:{c.key}:received"] = c.received
+        defaults[f"{scheme.id}:{c.key}:score"] = c.default_score
+    for key, value in defaults.items():
+        st.session_state.setdefault(key, value)
+
+    # Saved grades: the first time a student ID is entered for this course, its latest snapshot fills the inputs
+    student_id = st.sidebar.text_input("Student ID", help="Saves your grades on this computer and loads them when you come back").strip()
+    if student_id:
+        from history import open_store, snapshot_row
+
+        history_store = open_store()
+        if st.session_state.get('history:loaded') != (student_id, scheme.id):
+            snapshot = history_store.latest(student_id, scheme.id)
+            if snapshot is not None:
+                for key, (score, has_grade) in snapshot.components.items():
+                    if key in scheme.keys:
+                        st.session_state[f"{scheme.id}:{key}:received"] = has_grade
+                        st.session_state[f"{scheme.id}:{key}:score"] = score
+                if scheme.optional_rules:
+                    st.session_state[f"{scheme.id}:rules"] = snapshot.drop
+                st.session_state[f"{scheme.id}:target"] = snapshot.target
+                st.session_state[f"{scheme.id}:curve"] = snapshot.curve
+                st.session_state[f"{scheme.id}:section"] = snapshot.section
+            st.session_state['history:loaded'] = (student_id, scheme.id)
+        section = st.sidebar.text_input("Section", help="Lets your advisor find your grades with the rest of the section",
+                                        key=f"{scheme.id}:section").strip()
+
+    st.markdown(scheme.description)
 
 # Create two columns for the layout
 col1, col2 = st.columns(2)
 
-with col1:
+with col1, trace.span("grade inputs"):
     st.subheader("Enter Your Grades")
     
     # Checkboxes to indicate which grades are available
     st.write("Check the boxes for grades you have received:")
-    has_homework = st.checkbox("I have my homework grade", value=True)
-    has_discussion = st.checkbox("I have my discussion grade", value=True)
-    has_mid1 = st.checkbox("I have my Midterm 1 grade", value=True)
-    has_mid2 = st.checkbox("I have my Midterm 2 grade", value=True)
-    has_mid3 = st.checkbox("I have my Midterm 3 grade", value=False)
-    has_final = st.checkbox("I have my Final Exam grade", value=False)
+    received = {
+        c.key: st.checkbox(c.checkbox_label, key=f"{scheme.id}:{c.key}:received")
+        for c in scheme.components
+    }
     
     # Input fields for each component (as percentages)
-    homework = st.number_input("Homework grade (percentage)", min_value=0.0, max_value=100.0, value=100.0, disabled=not has_homework)
-    discussion = st.number_input("Discussion engagement (percentage)", min_value=0.0, max_value=100.0, value=100.0, disabled=not has_discussion)
-    mid1 = st.number_input("Midterm 1 score (percentage)", min_value=0.0, max_value=100.0, value=80.0, disabled=not has_mid1)
-    mid2 = st.number_input("Midterm 2 score (percentage)", min_value=0.0, max_value=100.0, value=80.0, disabled=not has_mid2)
-    mid3 = st.number_input("Midterm 3 score (percentage)", min_value=0.0, max_value=100.0, value=0.0, disabled=not has_mid3)
-    final = st.number_input("Final exam score (percentage)", min_value=0.0, max_value=100.0, value=0.0, disabled=not has_final)
+    scores = {
+        c.key: st.number_input(c.input_label, min_value=0.0, max_value=100.0,
+                               disabled=not received[c.key], key=f"{scheme.id}:{c.key}:score")
+        for c in scheme.components
+    }
 
 with col2:
-    st.subheader("Grade Prediction")
-    target_grade = st.number_input("Target Overall Grade (%)", min_value=0.0, max_value=100.0, value=80.0)
-    drop_lowest = st.checkbox("Drop Midterm 1 (if M1 < M2 and all three entered)?", value=False)
-    potential_curve = st.number_input("Potential Curve Adjustment (Points)", min_value=0.0, step=0.5, value=0.0, help="Enter potential points added by a curve to see how it affects requirements.")
-    
-    # Calculate current grade based on entered components
-    current_grade = 0
-    total_weight = 0
-    midterm_scores = {}
-    
-    # Define weights
-    weights = {
-        'homework': 0.05,
-        'discussion': 0.10,
-        'mid1': 0.20,
-        'mid2': 0.20,
-        'mid3': 0.20,
-        'final': 0.25
-    }
-    
-    # --- Calculate provisional grade and weight ---
-    component_inputs = {
-        'homework': (homework, has_homework),
-        'discussion': (discussion, has_discussion),
-        'mid1': (mid1, has_mid1),
-        'mid2': (mid2, has_mid2),
-        'mid3': (mid3, has_mid3),
-        'final': (final, has_final)
-    }
-    
-    all_midterms_entered = has_mid1 and has_mid2 and has_mid3
-    
-    for name, (score, has_grade) in component_inputs.items():
-        if has_grade:
-            current_grade += score * weights[name]
-            total_weight += weights[name]
-            if name in ['mid1', 'mid2', 'mid3']:
-                midterm_scores[name] = score
-
-    # --- Apply drop logic for Midterm 1 if applicable ---
-    dropped_midterm_info = ""
-    midterm_to_drop = None 
-    if drop_lowest and all_midterms_entered: 
-        if midterm_scores['mid1'] < midterm_scores['mid2']:
-            midterm1_score = midterm_scores['mid1']
-            current_grade -= midterm1_score * weights['mid1']
-            total_weight -= weights['mid1']
-            midterm_to_drop = 'mid1'
-            dropped_midterm_info = f"*Midterm 1 ({midterm1_score:.2f}%) dropped (was lower than Midterm 2: {midterm_scores['mid2']:.2f}%).*"
+    with trace.span("prediction inputs"):
+        st.subheader("Grade Prediction")
+        target_grade = st.number_input("Target Overall Grade (%)", min_value=0.0, max_value=100.0,
+                                       key=f"{scheme.id}:target")
+        optional_rules = scheme.optional_rules
+        if optional_rules:
+            rules_label = optional_rules[0].label if len(optional_rules) == 1 else "Apply optional drop/replace rules?"
+            drop_lowest = st.checkbox(rules_label, key=f"{scheme.id}:rules")
         else:
-             dropped_midterm_info = f"*Midterm 1 ({midterm_scores['mid1']:.2f}%) not dropped (not lower than Midterm 2: {midterm_scores['mid2']:.2f}%).*"
+            drop_lowest = False
+        potential_curve = st.number_input("Potential Curve Adjustment (Points)", min_value=0.0, step=0.5, help="Enter potential points added by a curve to see how it affects requirements.", key=f"{scheme.id}:curve")
+
+    # --- Calculate provisional grade and weight ---
+    component_inputs = {key: (scores[key], received[key]) for key in scheme.keys}
+
+    # Only the values downstream of a changed input are recomputed on a rerun
+    cache_before = cache_stats() if trace.enabled else None
+    with trace.span("derived values"):
+        derived = PAGE_GRAPH.evaluate({'components': component_inputs, 'drop': drop_lowest, 'target': target_grade,
+                                       'curve': potential_curve, 'scheme': scheme}, st.session_state, trace=trace)
+    if trace.enabled:
+        cache_after = cache_stats()
+        trace.count("prediction cache hits", cache_after['hits'] - cache_before['hits'])
+        trace.count("prediction cache misses", cache_after['misses'] - cache_before['misses'])
+        trace.count("recomputed values", len(derived.recomputed))
+    current_grade, total_weight, dropped = derived.values['accumulated']
+
+    # A new snapshot only when the inputs changed since the student's last one
+    if student_id:
+        with trace.span("save history"):
+            snapshot_id = history_store.save(student_id, component_inputs, drop_lowest, target_grade, potential_curve,
+                                             scheme, section)
+
+    # --- Describe drop/replace rules that applied (e.g. dropping Midterm 1) ---
+    dropped_midterm_info = derived.values['rule_info']
 
     # --- Display Current Progress ---
-    if total_weight > 0:
-        st.subheader("Current Progress")
-        st.write(f"Points Earned: {current_grade:.2f}% (out of {total_weight*100:.0f}% possible)") 
-        st.write(f"Completed: {total_weight*100:.0f}% of total grade")
-        if dropped_midterm_info:
-            st.info(dropped_midterm_info) 
-        st.write(f"Current Average Score on Included Work: {current_grade / total_weight:.2f}%")
-    else:
-        st.info("Please enter at least one grade to see your progress.")
+    with trace.span("render progress"):
+        if total_weight > 0:
+            st.subheader("Current Progress")
+            st.write(f"Points Earned: {current_grade:.2f}% (out of {total_weight*100:.0f}% possible)") 
+            st.write(f"Completed: {total_weight*100:.0f}% of total grade")
+            if dropped_midterm_info:
+                st.info(dropped_midterm_info) 
+            st.write(f"Current Average Score on Included Work: {derived.values['current_average']:.2f}%")
+        else:
+            st.info("Please enter at least one grade to see your progress.")
     
     # --- Calculate and Display Predictions ---
-    if st.checkbox("Show what's needed to reach target grade", value=True):
-        max_possible_weight = 1.0 - (weights['mid1'] if midterm_to_drop else 0.0)
-        
-        if total_weight < max_possible_weight: 
-            remaining_weight = max_possible_weight - total_weight
-            
-            # Adjust points needed by the potential curve adjustment
-            points_needed = target_grade - current_grade
-            adjusted_points_needed = points_needed - potential_curve # Apply curve adjustment here
-            
-            if remaining_weight > 0: 
-                # Calculate required average based on adjusted points needed
-                required_average_on_remaining = adjusted_points_needed / remaining_weight
-                
+    with trace.span("render prediction"):
+        if st.checkbox("Show what's needed to reach target grade", value=True):
+            prediction = derived.values['prediction']
+
+            if prediction.required_average is not None:
                 st.subheader("Prediction Results") 
-                # Modify text to mention the curve adjustment if it's non-zero
-                curve_text = f" (considering a {potential_curve:.2f} point potential curve adjustment)" if potential_curve > 0 else ""
-                st.write(f"To reach your target grade of **{target_grade:.2f}%**{curve_text}, you need an average score of:")
-                st.metric(label="Average on Remaining Assignments", value=f"{required_average_on_remaining:.2f}%")
-
-                remaining_assignments = []
-                for name, (score, has_grade) in component_inputs.items():
-                     if not has_grade and name != midterm_to_drop:
-                         remaining_assignments.append(f"{name.replace('mid','Midterm ').capitalize()} ({weights[name]*100:.0f}%)")
-                
-                if remaining_assignments:
-                    st.write(f"*Remaining assignments contributing {remaining_weight*100:.0f}% to the total grade:*")
-                    st.write(f"  - {', '.join(remaining_assignments)}")
-
-                # Update warning/success logic based on the adjusted required average
-                if required_average_on_remaining > 100:
-                    st.warning(f"⚠️ Even with the potential curve adjustment, achieving an average of {required_average_on_remaining:.2f}% on the remaining assignments is impossible (max is 100%). You may need to adjust your target or curve assumption.")
-                elif required_average_on_remaining < 0:
-                     st.success(f"🎉 With the potential curve adjustment considered, you've already met or exceeded your target grade of {target_grade:.2f}%!")
+                st.write(prediction.intro)
+                st.metric(label="Average on Remaining Assignments", value=prediction.metric)
+
+                for line in prediction.remaining:
+                    st.write(line)
+
+                # Warning/success logic based on the adjusted required average
+                if prediction.status == 'impossible':
+                    st.warning(prediction.message)
+                elif prediction.status == 'met':
+                     st.success(prediction.message)
+                else:
+                     st.info(prediction.message)
+
+            else: # All relevant grades entered
+                st.info("You have entered all grades required for the final calculation (considering dropped midterm if applicable).")
+                st.metric(label="Final Calculated Grade (with potential curve)", value=prediction.metric)
+                if prediction.status == 'final_met':
+                     st.success(prediction.message)
                 else:
-                     st.info(f"This adjusted average score of {required_average_on_remaining:.2f}% across the remaining assignments is needed to reach your goal{curve_text}.")
-
-            else: # points_needed <= 0 
-                 # Check if target met even *without* curve adjustment for a clearer message
-                 if (target_grade - current_grade) <= 0:
-                    st.success(f"🎉 You've already met or exceeded your target grade of {target_grade:.2f}% based on current entries (before any potential curve)! ")
-                 else: # Target met only *because* of the curve adjustment
-                    st.success(f"🎉 With the potential curve adjustment of {potential_curve:.2f} points, you meet or exceed your target grade of {target_grade:.2f}%!")
-        
-        elif total_weight >= max_possible_weight : # All relevant grades entered
-            st.info("You have entered all grades required for the final calculation (considering dropped midterm if applicable).")
-            # Calculate final grade considering potential curve
-            final_grade_with_curve = current_grade + potential_curve
-            final_grade_percentage = (final_grade_with_curve / total_weight) if total_weight > 0 else 0 
-            st.metric(label="Final Calculated Grade (with potential curve)", value=f"{final_grade_percentage:.2f}%")
-            if final_grade_percentage >= target_grade:
-                 st.success(f"Your final grade (with potential curve) meets or exceeds your target of {target_grade:.2f}%!")
-            else:
-                 st.warning(f"Your final grade (with potential curve) is below your target of {target_grade:.2f}%.")
+                     st.warning(prediction.message)
+
+    # --- Trade-off between the remaining assignments ---
+    remaining_keys = [key for key in scheme.keys if not received[key] and key not in dropped]
+    if len(remaining_keys) >= 2 and st.checkbox("Show the trade-off between remaining assignments", value=False):
+        with trace.span("trade-off"):
+            names = {c.key: c.name for c in scheme.components}
+            pivot = max(remaining_keys, key=scheme.weight)
+            others = [key for key in remaining_keys if key != pivot]
+            axis = st.selectbox(f"If this assignment goes badly, what does the {names[pivot]} need?", others, format_func=names.get)
+            assumed = {}
+            if len(others) > 1:
+                assumed_score = st.number_input("Assumed score on the other remaining assignments (%)", min_value=0.0, max_value=100.0, value=80.0)
+                assumed = {key: assumed_score for key in others if key != axis}
+            from frontier import frontier, frontier_rows
+
+            points = frontier(component_inputs, target_grade, axis, pivot, assumed, potential_curve, drop_lowest, scheme)
+            st.write(f"*Minimum {names[pivot]} score for your final grade (with potential curve) to reach {target_grade:.2f}%:*")
+            st.table(frontier_rows(points, names[axis], names[pivot]))
+
+    # --- Probability of reaching each cutoff ---
+    if remaining_keys and scheme.cutoffs and st.checkbox("Show probability of reaching each cutoff", value=False):
+        with trace.span("probability"):
+            from simulate import DEFAULT_SAMPLES, cutoff_probabilities  # NumPy is only needed here
+
+            probabilities, expected = cutoff_probabilities(component_inputs, DEFAULT_SAMPLES, potential_curve, drop_lowest, scheme=scheme)
+            for column, (grade, probability) in zip(st.columns(len(probabilities)), probabilities.items()):
+                column.metric(label=f"P({grade})", value=f"{probability:.0%}")
+            st.caption(f"From {DEFAULT_SAMPLES:,} simulated outcomes of your remaining assignments, drawn around your exam average "
+                       f"(expected final grade with potential curve: {expected:.2f}%).")
+
+    # --- Several targets and curves at once ---
+    if st.checkbox("Compare several targets and curves", value=False):
+        with trace.span("scenario matrix"):
+            import pandas as pd
+            from scenarios import MAX_PAGE_CELLS, grid_csv, grid_styles, grid_table, parse_sweep, student_grid
+
+            target_text = st.text_input("Targets (%)", "70, 80, 90", help="Comma-separated, or start:stop:step such as 50:90:10")
+            curve_text = st.text_input("Curves (points)", "0, 2.5, 5", help="Comma-separated, or start:stop:step such as 0:5:0.5")
+            try:
+                targets, curves = parse_sweep(target_text, MAX_PAGE_CELLS), parse_sweep(curve_text, MAX_PAGE_CELLS)
+            except ValueError as error:
+                targets = curves = None
+                st.error(f"{error}. Enter numbers separated by commas, or start:stop:step.")
+            if targets and curves and len(targets) * len(curves) > MAX_PAGE_CELLS:
+                st.error(f"That is {len(targets) * len(curves):,} scenarios; the page shows at most {MAX_PAGE_CELLS:,}.")
+            elif targets and curves:
+                values, statuses = student_grid(component_inputs, targets, curves, drop_lowest, scheme)
+                table = pd.DataFrame(grid_table(values, statuses, targets, curves)).set_index('Target')
+                st.dataframe(table.style.apply(lambda _: pd.DataFrame(grid_styles(statuses), index=table.index, columns=table.columns), axis=None))
+                st.caption("Required average on the remaining assignments for each target and curve, or the final grade once everything is entered.")
+                st.download_button("Download scenarios (CSV)", grid_csv(values, statuses, targets, curves, student_id),
+                                   file_name=f"scenarios-{student_id}.csv" if student_id else "scenarios.csv",
+                                   mime="text/csv")
+
+with st.sidebar, trace.span("sidebar"):
+    with st.expander("Prediction cache"):
+        stats = cache_stats()
+        st.write(f"Hit rate: {stats['hit_rate']:.1%} ({stats['hits']} hits, {stats['misses']} misses)")
+        st.write(f"Entries: {stats['size']} of {stats['maxsize']}")
+    st.caption(f"Recomputed {len(derived.recomputed)} of {len(PAGE_GRAPH.nodes)} derived values"
+               + (f": {', '.join(derived.recomputed)}" if derived.recomputed else ""))
+    if student_id:
+        with st.expander("Grade history"):
+            st.caption(f"Saved snapshot {snapshot_id}" if snapshot_id else "No changes since your last snapshot")
+            st.table([snapshot_row(snapshot) for snapshot in history_store.history(student_id, scheme.id, limit=10)])
 
 # Grade cutoff information
-st.subheader("Approximate Grade Cutoffs")
-st.markdown("""
-- A-: 80% (roughly fours and fives on exams and full discussion engagement)
-- B-: 70% (roughly threes and fours on exams and full discussion engagement)
-- C-: 50% (roughly twos and threes on exams and full discussion engagement)
-- D-: 40%
-- F: Below 40%
-
-*Note: These are approximate cutoffs. Final cutoffs may be adjusted lower but will not be set higher.*
-""") 
\ No newline at end of file
+with trace.span("cutoffs"):
+    st.subheader("Approximate Grade Cutoffs")
+    st.markdown(cutoffs_markdown(scheme))
+
+# Startup/rerun timing report
+run_stats = finish_run(trace, time.perf_counter() - run_started)
+if trace.enabled:
+    with st.sidebar.expander("Timing", expanded=True):
+        st.caption(run_stats)
+        st.table(trace.rows())
+        for name, value in trace.counters.items():
+            st.write(f"{name.capitalize()}: {value}")
+        st.download_button("Download Chrome trace", chrome_trace(), file_name="grade_calc_trace.json", mime="application/json")
+        if st.button(f"Save trace to {TRACE_FILE}"):
+            st.write(f"Saved {write_chrome_trace()}")
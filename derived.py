@@ -0,0 +1,95 @@
+"""
+Incremental recomputation of the page's derived values.
+
+A Graph is a list of nodes, each a function of named inputs or of earlier
+nodes. evaluate() keeps the last inputs and node values in a mutable mapping
+(st.session_state on the page) and only recomputes the nodes downstream of an
+input that changed. A node whose recomputed value equals the old one stops the
+propagation there.
+
+The page's graph:
+
+    components, drop ─▶ accumulated ─▶ points_earned, completed_weight ─▶ current_average
+                    └─▶ rule_info
+    components, drop, target, curve ─▶ prediction (required average and status message)
+"""
+
+from collections import namedtuple
+
+from grading import accumulate
+from prediction import cached_predict, rule_messages
+from timing import NULL_TRACE
+
+# values: every node's current value; recomputed: names of the nodes evaluated this time
+Evaluation = namedtuple('Evaluation', 'values recomputed')
+
+
+class Graph:
+    def __init__(self):
+        self.nodes = {}
+
+    def node(self, *dependencies):
+        """
+        Decorator registering a function as a node named after it. Dependencies
+        are input names or nodes registered earlier, so nodes run in the order
+        they are defined.
+        """
+        def register(func):
+            self.nodes[func.__name__] = (func, dependencies)
+            return func
+        return register
+
+    def evaluate(self, inputs, store, key='derived', trace=NULL_TRACE):
+        """Bring every node up to date with inputs, timing each recomputed node in trace. Returns an Evaluation."""
+        state = store.get(key)
+        if state is None:
+            state = store[key] = {'inputs': {}, 'values': {}}
+        previous, values = state['inputs'], state['values']
+
+        changed = {name for name, value in inputs.items() if name not in previous or previous[name] != value}
+        recomputed = []
+        for name, (func, dependencies) in self.nodes.items():
+            if name in values and not changed.intersection(dependencies):
+                continue
+            with trace.span(name):
+                value = func(*(inputs[d] if d in inputs else values[d] for d in dependencies))
+            recomputed.append(name)
+            if name not in values or values[name] != value:
+                changed.add(name)
+            values[name] = value
+
+        state['inputs'] = dict(inputs)
+        return Evaluation(dict(values), recomputed)
+
+
+PAGE_GRAPH = Graph()
+
+
+@PAGE_GRAPH.node('components', 'drop', 'scheme')
+def accumulated(components, drop, scheme):
+    return accumulate(components, drop, scheme)
+
+
+@PAGE_GRAPH.node('accumulated')
+def points_earned(accumulated):
+    return accumulated[0]
+
+
+@PAGE_GRAPH.node('accumulated')
+def completed_weight(accumulated):
+    return accumulated[1]
+
+
+@PAGE_GRAPH.node('points_earned', 'completed_weight')
+def current_average(points_earned, completed_weight):
+    return points_earned / completed_weight if completed_weight > 0 else None
+
+
+@PAGE_GRAPH.node('components', 'drop', 'scheme')
+def rule_info(components, drop, scheme):
+    return "\n\n".join(rule_messages(components, drop, scheme))
+
+
+@PAGE_GRAPH.node('components', 'drop', 'target', 'curve', 'scheme')
+def prediction(components, drop, target, curve, scheme):
+    return cached_predict(components, drop, target, curve, scheme)
@@ -0,0 +1,265 @@
+"""
+Exact "minimum score needed" solver for the remaining components.
+
+Once every component is in, the final grade is (points + curve) / weight, the
+same figure as the page's "Final Calculated Grade". With every other score
+fixed, that is an affine function of one component's score, except where a
+drop/replace rule flips (Midterm 1 is dropped only while it is below Midterm 2,
+so a future Midterm 2 score moves the breakpoint). minimum_needed() splits
+[0, 100] at those breakpoints, fits the affine piece in each interval and
+solves it exactly.
+
+frontier() answers "how much must the final compensate if Midterm 3 goes
+badly": the minimum pivot score as a function of one other remaining
+component. That function is piecewise linear and can jump where a rule
+flips. Its kinks sit at the axis score's rule breakpoints and wherever the
+minimum moves across a pivot region boundary: 0, 100, a pivot breakpoint, or
+the pivot score equal to the axis score when a rule compares the two. The grade
+at each such boundary is affine in the axis score between breakpoints, so every
+kink is solved analytically and a handful of points describe the whole curve
+exactly.
+"""
+
+from collections import namedtuple
+
+from grading import accumulate
+from schemes import DEFAULT_SCHEME
+
+# Scores are only ever compared to this precision
+EPSILON = 1e-9
+
+# needed is the minimum pivot score at axis score x, or None if the target is out of reach.
+# side is 'at' for the value at x itself, or 'below'/'above' for the limit just
+# next to x where a rule flips and the curve jumps.
+FrontierPoint = namedtuple('FrontierPoint', 'x needed side')
+
+
+def final_outcome(components, drop_midterm1_if_lower=False, curve_points=0, scheme=None):
+    """Final grade once every component is in, with the curve applied."""
+    points, total_weight, _ = accumulate(components, drop_midterm1_if_lower, scheme)
+    return (points + curve_points) / total_weight if total_weight > 0 else 0
+
+
+def _active_rules(drop_midterm1_if_lower, scheme):
+    return [rule for rule in scheme.rules if drop_midterm1_if_lower or not rule.optional]
+
+
+def _breakpoints(key, state, drop_midterm1_if_lower, scheme, exclude=None):
+    """Scores of `key` where an active rule switches, i.e. the score it is compared with."""
+    position = scheme.index[key]
+    points = set()
+    for rule in _active_rules(drop_midterm1_if_lower, scheme):
+        if position == rule.component:
+            other = scheme.keys[rule.compare_to]
+        elif position == rule.compare_to:
+            other = scheme.keys[rule.component]
+        else:
+            continue
+        if other != exclude:
+            points.add(state[other][0])
+    return points
+
+
+def _completed_state(components, pivot, assumed, scheme):
+    """Components with every remaining score besides the pivot filled in from assumed."""
+    if components[pivot][1]:
+        raise ValueError(f"{pivot!r} has already been graded")
+    state = dict(components)
+    for key in scheme.keys:
+        if key == pivot or state[key][1]:
+            continue
+        if key not in assumed:
+            raise ValueError(f"No assumed score for remaining component {key!r}")
+        state[key] = (float(assumed[key]), True)
+    return state
+
+
+def minimum_needed(components, target_grade, pivot='final', assumed=None, curve_points=0,
+                   drop_midterm1_if_lower=False, scheme=None):
+    """
+    Lowest score on `pivot` that brings the final grade to target_grade, given
+    assumed scores for every other remaining component. Returns 0 if the target
+    is met regardless, and None if even 100 on the pivot is not enough.
+    """
+    scheme = scheme or DEFAULT_SCHEME
+    state = _completed_state(components, pivot, assumed or {}, scheme)
+
+    def grade_at(score):
+        state[pivot] = (score, True)
+        return final_outcome(state, drop_midterm1_if_lower, curve_points, scheme)
+
+    cuts = sorted({0.0, 100.0} | {b for b in _breakpoints(pivot, state, drop_midterm1_if_lower, scheme) if 0 < b < 100})
+    for lo, hi in zip(cuts, cuts[1:]):
+        if grade_at(lo) >= target_grade - EPSILON:
+            return lo
+        # No rule flips inside (lo, hi), so the grade is affine there
+        left, right = lo + (hi - lo) / 3, lo + 2 * (hi - lo) / 3
+        grade_left, grade_right = grade_at(left), grade_at(right)
+        slope = (grade_right - grade_left) / (right - left)
+        intercept = grade_left - slope * left
+        if slope > EPSILON:
+            needed = (target_grade - intercept) / slope
+            if needed <= lo:
+                return lo
+            if needed < hi:
+                return needed
+        elif intercept + slope * lo >= target_grade - EPSILON:
+            return lo
+    if grade_at(100.0) >= target_grade - EPSILON:
+        return 100.0
+    return None
+
+
+def _collinear(points):
+    if all(v is None for _, v in points):
+        return True
+    if any(v is None for _, v in points):
+        return False
+    (x0, v0), (x1, v1) = points[0], points[-1]
+    slope = (v1 - v0) / (x1 - x0)
+    return all(abs(v0 + slope * (x - x0) - v) <= 1e-7 for x, v in points)
+
+
+def _distinct(values):
+    """Sorted values with near-duplicates (the same root solved twice) collapsed, ends kept."""
+    values = sorted(values)
+    kept = [values[0]]
+    for value in values[1:]:
+        if value - kept[-1] > 1e-7:
+            kept.append(value)
+        elif value == values[-1]:
+            kept[-1] = value
+    return kept
+
+
+def _coupled(axis, pivot, drop_midterm1_if_lower, scheme):
+    """Whether an active rule compares the axis and pivot scores with each other."""
+    pair = {scheme.index[axis], scheme.index[pivot]}
+    return any({rule.component, rule.compare_to} == pair for rule in _active_rules(drop_midterm1_if_lower, scheme))
+
+
+def _affine_root(func, lo, hi, target_grade):
+    """x in (lo, hi) where func, affine there, equals target_grade, or None."""
+    left, right = lo + (hi - lo) / 3, lo + 2 * (hi - lo) / 3
+    value_left, value_right = func(left), func(right)
+    slope = (value_right - value_left) / (right - left)
+    if abs(slope) > EPSILON:
+        root = left + (target_grade - value_left) / slope
+        if lo < root < hi:
+            return root
+    return None
+
+
+def frontier(components, target_grade, axis, pivot='final', assumed=None, curve_points=0,
+             drop_midterm1_if_lower=False, scheme=None):
+    """
+    Minimum pivot score for every score on `axis`, as FrontierPoints sorted by x.
+    Linear interpolation between consecutive points with a needed value is exact.
+    Every remaining component other than axis and pivot needs an assumed score.
+    """
+    scheme = scheme or DEFAULT_SCHEME
+    if axis == pivot:
+        raise ValueError("axis and pivot must be different components")
+    if components[axis][1]:
+        raise ValueError(f"{axis!r} has already been graded")
+    assumed = dict(assumed or {})
+    state = _completed_state(components, pivot, dict(assumed, **{axis: 0.0}), scheme)
+    coupled = _coupled(axis, pivot, drop_midterm1_if_lower, scheme)
+
+    def needed_at(x):
+        assumed[axis] = x
+        return minimum_needed(components, target_grade, pivot, assumed, curve_points, drop_midterm1_if_lower, scheme)
+
+    def grade_at(x, pivot_score):
+        state[axis] = (x, True)
+        state[pivot] = (pivot_score, True)
+        return final_outcome(state, drop_midterm1_if_lower, curve_points, scheme)
+
+    # Pivot scores where a rule flips whatever the axis score is; with a rule
+    # comparing the two, the pivot score equal to x is one more
+    pivot_cuts = sorted({0.0, 100.0} | {b for b in _breakpoints(pivot, state, drop_midterm1_if_lower, scheme, exclude=axis)
+                                        if 0 < b < 100})
+
+    def grade_limit(x, pivot_score, side):
+        """The grade at pivot_score, or its limit from the side, where rule flips make it jump."""
+        if side == 'at':
+            return grade_at(x, pivot_score)
+        bounds = pivot_cuts + ([x] if coupled else [])
+        if side == 'above':
+            bound = min(b for b in bounds if b > pivot_score)
+        else:
+            bound = max(b for b in bounds if b < pivot_score)
+        # Affine between pivot_score and the next flip, so extrapolate from two points inside
+        near, far = pivot_score + (bound - pivot_score) / 3, pivot_score + 2 * (bound - pivot_score) / 3
+        grade_near = grade_at(x, near)
+        return grade_near - (grade_at(x, far) - grade_near) * (near - pivot_score) / (far - near)
+
+    cuts = {0.0, 100.0} | {b for b in _breakpoints(axis, state, drop_midterm1_if_lower, scheme, exclude=pivot)
+                           if 0 < b < 100}
+    if coupled:
+        # The comparison of the two flips as x passes each fixed pivot cut
+        cuts |= set(pivot_cuts)
+    cuts = sorted(cuts)
+
+    # Within an interval between cuts, needed(x) is affine except where the
+    # minimum moves from one pivot region to another. That happens where the
+    # grade at a region boundary (a pivot cut, or the pivot score equal to x
+    # when the rule couples them) just reaches the target; every such boundary
+    # grade is affine in x inside the interval, so each crossing is solved exactly.
+    boundaries = [(lambda x, p=p, side=side: grade_limit(x, p, side))
+                  for p in pivot_cuts for side in ('below', 'at', 'above')
+                  if not (p == 0.0 and side == 'below') and not (p == 100.0 and side == 'above')]
+    if coupled:
+        boundaries += [(lambda x, side=side: grade_limit(x, x, side)) for side in ('below', 'at', 'above')]
+    exact = set()
+    for lo, hi in zip(cuts, cuts[1:]):
+        for boundary in boundaries:
+            root = _affine_root(boundary, lo, hi, target_grade)
+            if root is not None:
+                exact.add(root)
+    cuts = _distinct(cuts + sorted(exact))
+
+    points = [FrontierPoint(cuts[0], needed_at(cuts[0]), 'at')]
+    for lo, hi in zip(cuts, cuts[1:]):
+        # needed is affine on (lo, hi): its limits at both ends come from two points inside
+        left, right = lo + (hi - lo) / 3, lo + 2 * (hi - lo) / 3
+        needed_left, needed_right = needed_at(left), needed_at(right)
+        if needed_left is None or needed_right is None:
+            limits = (None, None)
+        else:
+            slope = (needed_right - needed_left) / (right - left)
+            limits = (needed_left + slope * (lo - left), needed_left + slope * (hi - left))
+        points.append(FrontierPoint(lo, limits[0], 'above'))
+        points.append(FrontierPoint(hi, limits[1], 'below'))
+        points.append(FrontierPoint(hi, needed_at(hi), 'at'))
+
+    def same(a, b):
+        return a == b or (a is not None and b is not None and abs(a - b) <= 1e-7)
+
+    # Drop one-sided limits that agree with the value at the same x
+    at = {p.x: p.needed for p in points if p.side == 'at'}
+    points = [p for p in points if p.side == 'at' or not same(p.needed, at[p.x])]
+
+    # Drop points in the middle of a straight stretch
+    kept = []
+    for i, point in enumerate(points):
+        if 0 < i < len(points) - 1 and point.side == 'at' and point.x not in cuts[:1] + cuts[-1:]:
+            before, after = points[i - 1], points[i + 1]
+            if before.side == 'at' and after.side == 'at' and _collinear(
+                    [(before.x, before.needed), (point.x, point.needed), (after.x, after.needed)]):
+                continue
+        kept.append(point)
+    return kept
+
+
+def frontier_rows(points, axis_name, pivot_name):
+    """Table rows for a frontier."""
+    rows = []
+    for point in points:
+        x = f"{point.x:.2f}%"
+        label = x if point.side == 'at' else f"just {point.side} {x}"
+        rows.append({
+            f"{axis_name} score": label,
+            f"{pivot_name} needed": f"{point.needed:.2f}%" if point.needed is not None else "Not reachable",
+        })
+    return rows
@@ -0,0 +1,176 @@
+"""
+Stream a gradebook export through the grading engine.
+
+    python gradebook.py roster.csv -o results.csv --target 80 --curve 2 --drop-mid1
+
+Input is a CSV with a header row or a JSONL file with one object per student.
+Component columns are named after the scheme's component keys (homework,
+discussion, mid1, mid2, mid3 and final for the default course). A blank cell
+(CSV) or a missing/null value (JSONL) means the grade has not been received
+yet. An optional student_id column is passed through unchanged. A score that
+is not a number stops the run with an error naming its row and column.
+
+Rows are read, graded and written one at a time, so memory use does not grow
+with the size of the export. With --workers N, rows are graded in chunks across
+N processes with only a few chunks in flight at once.
+"""
+
+import argparse
+import csv
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+
+from grading import accumulate, required_average
+from parallel import DEFAULT_CHUNK_SIZE, chunked, imap_ordered
+from records import Roster
+from schemes import DEFAULT_SCHEME, get_scheme
+
+ID_FIELD = 'student_id'
+RESULT_FIELDS = (ID_FIELD, 'current_grade', 'completed_weight', 'required_average', 'dropped')
+
+
+def detect_format(path, default='csv'):
+    """'jsonl' or 'csv' based on the file extension."""
+    if path.endswith(('.jsonl', '.ndjson', '.json')):
+        return 'jsonl'
+    if path.endswith('.csv'):
+        return 'csv'
+    return default
+
+
+def read_records(stream, fmt):
+    """Yield one raw dictionary per student from an open text stream."""
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+    else:
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+
+
+def parse_components(record, scheme=None, row=None):
+    """
+    Turn a raw record into a (student_id, components) pair. row, the record's
+    1-based position in the export, only goes into the error for a bad score.
+    """
+    components = {}
+    for key in (scheme or DEFAULT_SCHEME).keys:
+        value = record.get(key)
+        if value is None or value == '':
+            components[key] = (0.0, False)
+            continue
+        try:
+            components[key] = (float(value), True)
+        except (TypeError, ValueError):
+            where = f"Row {row}" if row is not None else "Record"
+            student_id = record.get(ID_FIELD)
+            raise ValueError(f"{where}{f' (student {student_id})' if student_id else ''}: "
+                             f"{key} is not a number: {value!r}") from None
+    return record.get(ID_FIELD, ''), components
+
+
+def load_roster(records, scheme=None, keep_ids=True):
+    """Pack raw records into a compact Roster, for batches that need every student in memory."""
+    roster = Roster(scheme, keep_ids)
+    for row, record in enumerate(records, 1):
+        student_id, components = parse_components(record, scheme, row)
+        roster.append(components, student_id)
+    return roster
+
+
+def grade_records(records, target_grade, curve_points=0, drop_midterm1_if_lower=False, scheme=None, first_row=1):
+    """
+    Yield one result dictionary per raw record. 'dropped' lists the components
+    removed by drop rules (Midterm 1 for the default course). first_row numbers
+    the records in error messages.
+    """
+    for row, record in enumerate(records, first_row):
+        student_id, components = parse_components(record, scheme, row)
+        current_grade, total_weight, dropped = accumulate(components, drop_midterm1_if_lower, scheme)
+        yield {
+            ID_FIELD: student_id,
+            'current_grade': current_grade / total_weight if total_weight > 0 else 0,
+            'completed_weight': total_weight,
+            'required_average': required_average(current_grade, total_weight, dropped, target_grade, curve_points, scheme),
+            'dropped': list(dropped),
+        }
+
+
+def _grade_chunk(task):
+    records, target_grade, curve_points, drop_midterm1_if_lower, scheme, first_row = task
+    return list(grade_records(records, target_grade, curve_points, drop_midterm1_if_lower, scheme, first_row))
+
+
+def grade_records_parallel(records, executor, workers, target_grade, curve_points=0,
+                           drop_midterm1_if_lower=False, scheme=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """grade_records spread over a process pool, still yielding results in input order."""
+    tasks = ((chunk, target_grade, curve_points, drop_midterm1_if_lower, scheme, 1 + i * chunk_size)
+             for i, chunk in enumerate(chunked(records, chunk_size)))
+    return chain.from_iterable(imap_ordered(executor, _grade_chunk, tasks, 2 * workers))
+
+
+def write_results(results, stream, fmt):
+    """Write result dictionaries as they arrive. Returns the number of rows written."""
+    count = 0
+    if fmt == 'csv':
+        writer = csv.DictWriter(stream, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        for result in results:
+            if result['required_average'] is None:
+                result['required_average'] = ''
+            result['dropped'] = ';'.join(result['dropped'])
+            writer.writerow(result)
+            count += 1
+    else:
+        for result in results:
+            stream.write(json.dumps(result) + '\n')
+            count += 1
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grade every student in a CSV or JSONL gradebook export.")
+    parser.add_argument('input', help="gradebook export, or - for stdin")
+    parser.add_argument('-o', '--output', default='-', help="results file, or - for stdout (default)")
+    parser.add_argument('--input-format', choices=('csv', 'jsonl'), help="defaults to the input file extension")
+    parser.add_argument('--output-format', choices=('csv', 'jsonl'), help="defaults to the output file extension")
+    parser.add_argument('--target', type=float, default=80.0, help="target overall grade (%%) for the required average")
+    parser.add_argument('--curve', type=float, default=0.0, help="potential curve adjustment (points)")
+    parser.add_argument('--drop-mid1', action='store_true', help="apply the scheme's optional drop rules (drop Midterm 1 if M1 < M2 and all three entered)")
+    parser.add_argument('--scheme', help="grading scheme id or scheme file (default: the syllabus course)")
+    parser.add_argument('--workers', type=int, default=1, help="grade in a pool of this many processes")
+    args = parser.parse_args(argv)
+
+    scheme = get_scheme(args.scheme)
+    input_format = args.input_format or detect_format(args.input)
+    output_format = args.output_format or detect_format(args.output)
+
+    source = sys.stdin if args.input == '-' else open(args.input, newline='', encoding='utf-8')
+    sink = sys.stdout if args.output == '-' else open(args.output, 'w', newline='', encoding='utf-8')
+    executor = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+    start = time.perf_counter()
+    try:
+        records = read_records(source, input_format)
+        if executor:
+            results = grade_records_parallel(records, executor, args.workers, args.target, args.curve, args.drop_mid1, scheme)
+        else:
+            results = grade_records(records, args.target, args.curve, args.drop_mid1, scheme)
+        count = write_results(results, sink, output_format)
+    finally:
+        if executor:
+            executor.shutdown()
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+    elapsed = time.perf_counter() - start
+
+    rate = count / elapsed if elapsed > 0 else float('inf')
+    print(f"Graded {count} students in {elapsed:.2f}s ({rate:,.0f} rows/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+"""
+Binary columnar gradebook files, memory-mapped for instant reload.
+
+    python gradefile.py pack roster.csv roster.grades --scheme default
+    python gradefile.py grade roster.grades -o results.csv --target 80 --drop-mid1
+    python gradefile.py unpack roster.grades roster.csv
+
+Layout, little-endian:
+
+    header      64 bytes: magic b'GRDFILE1', version (u16), reserved (u16),
+                component count (u32), student count (u64), scheme id (32 bytes,
+                UTF-8, NUL padded), student id section offset (u64, 0 if none)
+    scores      one contiguous float32 column of N scores per component, in
+                scheme component order
+    has-grade   one packed bitmap of ceil(N / 8) bytes per component, bit i of
+                byte b (least significant first) is student 8b + i
+    student ids optional, 8-byte aligned: N + 1 u64 offsets into a UTF-8 blob
+
+GradeFile maps the file with mmap and exposes the columns as NumPy views, so
+opening is constant time whatever the size and grading a range of students only
+touches the pages holding those rows. Scores are float32: exact for the usual
+whole, half and quarter percentages, within about 1e-5 otherwise. Grades are
+computed in float64 from the stored scores by the vectorized engine.
+"""
+
+import argparse
+import csv
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+from array import array
+
+import numpy as np
+
+from gradebook import ID_FIELD, detect_format, parse_components, read_records, write_results
+from schemes import DEFAULT_SCHEME, get_scheme
+from vectorized import accumulate_matrix, percentages, required_averages
+
+MAGIC = b'GRDFILE1'
+VERSION = 1
+HEADER = struct.Struct('<8sHHIQ32sQ')
+SCHEME_ID_SIZE = 32
+
+# Students graded per NumPy batch
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+# Students GradeFileWriter.append() packs into its buffers before writing them out
+APPEND_CHUNK_SIZE = 65_536
+
+
+def _bitmap_size(count):
+    return (count + 7) // 8
+
+
+def _align(offset):
+    return (offset + 7) // 8 * 8
+
+
+class GradeFileWriter:
+    """
+    Write a gradebook file in one streaming pass. Columns are spooled to
+    temporary files and joined on close(), so memory use stays bounded:
+    append() packs each student straight into fixed score and has-grade
+    arrays of chunk_size rows, written out whenever they fill up.
+    """
+
+    def __init__(self, path, scheme=None, keep_ids=True, chunk_size=APPEND_CHUNK_SIZE):
+        self.path = path
+        self.scheme = scheme or DEFAULT_SCHEME
+        scheme_id = self.scheme.id.encode('utf-8')
+        if len(scheme_id) > SCHEME_ID_SIZE:
+            raise ValueError(f"Scheme id {self.scheme.id!r} is longer than {SCHEME_ID_SIZE} bytes")
+        self.chunk_size = chunk_size
+        self.count = 0
+        width = len(self.scheme.keys)
+        self._columns = [tempfile.TemporaryFile() for _ in range(width)]
+        self._bitmaps = [bytearray() for _ in range(width)]
+        self._carry = np.zeros((0, width), dtype=bool)
+        self._ids = (tempfile.TemporaryFile(), array('Q', [0])) if keep_ids else None
+        self._scores = np.empty((chunk_size, width))
+        self._has_grade = np.empty((chunk_size, width), dtype=bool)
+        self._pending_ids = []
+        self._pending = 0
+
+    def append(self, components, student_id=''):
+        """Add one student given as a component dictionary."""
+        row = self._pending
+        for j, key in enumerate(self.scheme.keys):
+            self._scores[row, j], self._has_grade[row, j] = components[key]
+        self._pending_ids.append(student_id)
+        self._pending = row + 1
+        if self._pending == self.chunk_size:
+            self._flush_pending()
+
+    def append_matrix(self, scores, has_grade, student_ids=None):
+        """Add a block of students as (scores, has_grade) arrays in scheme component order."""
+        self._flush_pending()
+        self._write(np.asarray(scores), np.asarray(has_grade, dtype=bool), student_ids)
+
+    def _flush_pending(self):
+        if not self._pending:
+            return
+        count, student_ids = self._pending, self._pending_ids
+        self._pending, self._pending_ids = 0, []
+        self._write(self._scores[:count], self._has_grade[:count], student_ids)
+
+    def _write(self, scores, has_grade, student_ids):
+        for j, column in enumerate(self._columns):
+            column.write(scores[:, j].astype('<f4').tobytes())
+
+        # Only whole bytes are packed; the last few flags wait for the next block
+        bits = np.concatenate([self._carry, has_grade])
+        whole = len(bits) // 8 * 8
+        for j, bitmap in enumerate(self._bitmaps):
+            bitmap += np.packbits(bits[:whole, j], bitorder='little').tobytes()
+        self._carry = bits[whole:]
+
+        if self._ids is not None:
+            if student_ids is None:
+                raise ValueError("This file keeps student ids, so every block needs them")
+            blob, offsets = self._ids
+            for student_id in student_ids:
+                encoded = str(student_id).encode('utf-8')
+                blob.write(encoded)
+                offsets.append(offsets[-1] + len(encoded))
+        self.count += len(scores)
+
+    def close(self):
+        self._flush_pending()
+        for j, bitmap in enumerate(self._bitmaps):
+            if len(self._carry):
+                bitmap += np.packbits(self._carry[:, j], bitorder='little').tobytes()
+
+        width = len(self._columns)
+        bitmaps_end = HEADER.size + width * self.count * 4 + width * _bitmap_size(self.count)
+        ids_offset = _align(bitmaps_end) if self._ids is not None else 0
+        header = HEADER.pack(MAGIC, VERSION, 0, width, self.count, self.scheme.id.encode('utf-8'), ids_offset)
+
+        # Written beside the target and renamed into place, so a failed write
+        # never leaves a file that looks complete
+        partial = f"{os.fspath(self.path)}.partial"
+        out = open(partial, 'wb')
+        try:
+            with out:
+                out.write(header)
+                for column in self._columns:
+                    column.seek(0)
+                    shutil.copyfileobj(column, out)
+                for bitmap in self._bitmaps:
+                    out.write(bitmap)
+                if self._ids is not None:
+                    blob, offsets = self._ids
+                    out.write(b'\0' * (ids_offset - bitmaps_end))
+                    out.write(np.frombuffer(offsets, dtype=np.uint64).astype('<u8').tobytes())
+                    blob.seek(0)
+                    shutil.copyfileobj(blob, out)
+            os.replace(partial, self.path)
+        except BaseException:
+            os.unlink(partial)
+            raise
+        finally:
+            self.discard()
+
+    def discard(self):
+        """Drop everything written so far without creating the file."""
+        for column in self._columns:
+            column.close()
+        if self._ids is not None:
+            self._ids[0].close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+class GradeFile:
+    """A gradebook file mapped read-only into memory."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as source:
+            self._map = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < HEADER.size:
+            raise ValueError(f"{path} is too short to be a gradebook file")
+        magic, version, _, width, count, scheme_id, ids_offset = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a gradebook file")
+        if version != VERSION:
+            raise ValueError(f"{path} has unsupported version {version}")
+
+        self.scheme_id = scheme_id.rstrip(b'\0').decode('utf-8')
+        self.width = width
+        self.count = count
+        buffer = memoryview(self._map)
+        self.columns = [
+            np.frombuffer(buffer, dtype='<f4', count=count, offset=HEADER.size + j * count * 4)
+            for j in range(width)
+        ]
+        bitmaps_offset = HEADER.size + width * count * 4
+        self.bitmaps = [
+            np.frombuffer(buffer, dtype=np.uint8, count=_bitmap_size(count), offset=bitmaps_offset + j * _bitmap_size(count))
+            for j in range(width)
+        ]
+        if ids_offset:
+            self._id_offsets = np.frombuffer(buffer, dtype='<u8', count=count + 1, offset=ids_offset)
+            self._id_blob = ids_offset + (count + 1) * 8
+        else:
+            self._id_offsets = None
+
+    @property
+    def scheme(self):
+        return get_scheme(self.scheme_id)
+
+    @property
+    def has_ids(self):
+        return self._id_offsets is not None
+
+    def __len__(self):
+        return self.count
+
+    def has_grade(self, j, start=0, stop=None):
+        """Has-grade flags of component j for students start..stop."""
+        stop = self.count if stop is None else stop
+        bits = np.unpackbits(self.bitmaps[j][start // 8:_bitmap_size(stop)], bitorder='little')
+        return bits[start % 8:start % 8 + stop - start].astype(bool)
+
+    def matrix(self, start=0, stop=None):
+        """(scores, has_grade) arrays for students start..stop, ready for vectorized grading."""
+        stop = self.count if stop is None else min(stop, self.count)
+        scores = np.empty((stop - start, self.width))
+        has_grade = np.empty((stop - start, self.width), dtype=bool)
+        for j, column in enumerate(self.columns):
+            scores[:, j] = column[start:stop]
+            has_grade[:, j] = self.has_grade(j, start, stop)
+        return scores, has_grade
+
+    def student_ids(self, start=0, stop=None):
+        stop = self.count if stop is None else min(stop, self.count)
+        if self._id_offsets is None:
+            return [''] * (stop - start)
+        offsets = self._id_offsets[start:stop + 1].tolist()
+        blob = self._map[self._id_blob + offsets[0]:self._id_blob + offsets[-1]]
+        return [blob[a - offsets[0]:b - offsets[0]].decode('utf-8') for a, b in zip(offsets, offsets[1:])]
+
+    def close(self):
+        self.columns = self.bitmaps = self._id_offsets = None
+        try:
+            self._map.close()
+        except BufferError:
+            pass  # arrays handed out still view the file; the mapping goes when they do
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def pack(records, path, scheme=None, keep_ids=True, chunk_size=APPEND_CHUNK_SIZE):
+    """Write raw gradebook records (see gradebook.read_records) to a gradebook file. Returns the student count."""
+    with GradeFileWriter(path, scheme, keep_ids, chunk_size) as writer:
+        for row, record in enumerate(records, 1):
+            student_id, components = parse_components(record, writer.scheme, row)
+            writer.append(components, student_id)
+    return writer.count
+
+
+def unpack(gradefile, stream, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Write a gradebook file back out as a CSV export. Returns the student count."""
+    keys = gradefile.scheme.keys
+    writer = csv.writer(stream)
+    writer.writerow((ID_FIELD,) + keys)
+    for start in range(0, len(gradefile), chunk_size):
+        stop = min(start + chunk_size, len(gradefile))
+        ids = gradefile.student_ids(start, stop)
+        # float32 scalars print their shortest repr, so 87.3 comes back as 87.3
+        columns = [[str(score) if has else '' for score, has in zip(column[start:stop], gradefile.has_grade(j, start, stop))]
+                   for j, column in enumerate(gradefile.columns)]
+        writer.writerows(zip(ids, *columns))
+    return len(gradefile)
+
+
+def grade_file(gradefile, target_grade, curve_points=0, drop_midterm1_if_lower=False, scheme=None,
+               start=0, stop=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield one result dictionary per student, shaped like gradebook.grade_records,
+    grading chunk_size students at a time with the vectorized engine.
+    """
+    scheme = scheme or gradefile.scheme
+    if len(scheme.keys) != gradefile.width:
+        raise ValueError(f"Scheme {scheme.id!r} has {len(scheme.keys)} components, the file has {gradefile.width}")
+    stop = len(gradefile) if stop is None else min(stop, len(gradefile))
+    for chunk_start in range(start, stop, chunk_size):
+        chunk_stop = min(chunk_start + chunk_size, stop)
+        scores, has_grade = gradefile.matrix(chunk_start, chunk_stop)
+        points, total_weight, dropped = accumulate_matrix(scores, has_grade, drop_midterm1_if_lower, scheme, by_component=True)
+        current = percentages(points, total_weight)
+        required = required_averages(points, total_weight, dropped, target_grade, curve_points, scheme)
+        for student_id, grade, weight, needed, dropped_row in zip(
+                gradefile.student_ids(chunk_start, chunk_stop), current.tolist(), total_weight.tolist(),
+                required.tolist(), dropped.tolist()):
+            yield {
+                ID_FIELD: student_id,
+                'current_grade': grade,
+                'completed_weight': weight,
+                'required_average': None if needed != needed else needed,
+                'dropped': [key for key, flag in zip(scheme.keys, dropped_row) if flag],
+            }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert, inspect and grade binary gradebook files.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    pack_parser = commands.add_parser('pack', help="convert a CSV or JSONL export to a gradebook file")
+    pack_parser.add_argument('input')
+    pack_parser.add_argument('output')
+    pack_parser.add_argument('--input-format', choices=('csv', 'jsonl'), help="defaults to the input file extension")
+    pack_parser.add_argument('--scheme', help="grading scheme id or scheme file (default: the syllabus course)")
+    pack_parser.add_argument('--no-ids', action='store_true', help="don't store student ids")
+
+    unpack_parser = commands.add_parser('unpack', help="convert a gradebook file to a CSV export")
+    unpack_parser.add_argument('input')
+    unpack_parser.add_argument('output', nargs='?', default='-', help="CSV file, or - for stdout (default)")
+
+    grade_parser = commands.add_parser('grade', help="grade every student in a gradebook file")
+    grade_parser.add_argument('input')
+    grade_parser.add_argument('-o', '--output', default='-', help="results file, or - for stdout (default)")
+    grade_parser.add_argument('--output-format', choices=('csv', 'jsonl'), help="defaults to the output file extension")
+    grade_parser.add_argument('--target', type=float, default=80.0, help="target overall grade (%%) for the required average")
+    grade_parser.add_argument('--curve', type=float, default=0.0, help="potential curve adjustment (points)")
+    grade_parser.add_argument('--drop-mid1', action='store_true', help="apply the scheme's optional drop rules")
+    grade_parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.command == 'pack':
+        with open(args.input, newline='', encoding='utf-8') as source:
+            records = read_records(source, args.input_format or detect_format(args.input))
+            count = pack(records, args.output, get_scheme(args.scheme), keep_ids=not args.no_ids)
+        print(f"Packed {count} students in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+        return
+
+    with GradeFile(args.input) as gradefile:
+        sink = sys.stdout if args.output == '-' else open(args.output, 'w', newline='', encoding='utf-8')
+        try:
+            if args.command == 'unpack':
+                count = unpack(gradefile, sink)
+            else:
+                results = grade_file(gradefile, args.target, args.curve, args.drop_mid1, chunk_size=args.chunk_size)
+                count = write_results(results, sink, args.output_format or detect_format(args.output))
+        finally:
+            if sink is not sys.stdout:
+                sink.close()
+    verb = 'Unpacked' if args.command == 'unpack' else 'Graded'
+    print(f"{verb} {count} students in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Pure-Python grading engine shared by the Streamlit page and the tests.
+
+Nothing in here imports streamlit, so whole rosters can be graded in-process
+without going through a page rerun per student.
+
+Every function takes an optional compiled scheme (see schemes.py) and uses the
+course from syllabus.md when none is given. The drop_midterm1_if_lower flag
+turns on the scheme's optional drop/replace rules, which for that course is
+the Midterm 1 drop.
+"""
+
+from records import Roster, StudentRecord
+from schemes import DEFAULT_SCHEME
+
+# Weights, component order and cutoffs of the default course
+WEIGHTS = dict(zip(DEFAULT_SCHEME.keys, DEFAULT_SCHEME.weights))
+COMPONENTS = DEFAULT_SCHEME.keys
+CUTOFFS = {cutoff.grade: cutoff.min for cutoff in DEFAULT_SCHEME.cutoffs}
+
+# Remaining weight at or below this is treated as "everything entered"
+WEIGHT_TOLERANCE = 1e-6
+
+
+def accumulate(components, drop_midterm1_if_lower=False, scheme=None):
+    """
+    Sum the weighted points and weight of the received components.
+    components is a dictionary mapping each component key (homework, discussion,
+    mid1, mid2, mid3, final for the default course) to a tuple of (score, has_grade).
+    A StudentRecord works too. Returns (points, total_weight, dropped) where
+    dropped is a tuple of the component keys removed by drop rules.
+    """
+    scheme = scheme or DEFAULT_SCHEME
+    if isinstance(components, StudentRecord) and components.scheme is scheme:
+        entries = components.entries()
+    else:
+        entries = [components[key] for key in scheme.keys]
+    return _accumulate(entries, drop_midterm1_if_lower, scheme)
+
+
+def _accumulate(entries, drop_midterm1_if_lower, scheme):
+    # entries holds (score, has_grade) in scheme component order
+    current_grade = 0
+    total_weight = 0
+
+    for (score, has_grade), weight in zip(entries, scheme.weights):
+        if has_grade:
+            current_grade += score * weight
+            total_weight += weight
+
+    # Run the scheme's rule program in order
+    dropped = ()
+    for rule in scheme.rules:
+        if rule.optional and not drop_midterm1_if_lower:
+            continue
+        if not all(entries[i][1] for i in rule.requires) or scheme.keys[rule.component] in dropped:
+            continue
+        score = entries[rule.component][0]
+        other = entries[rule.compare_to][0]
+        weight = scheme.weights[rule.component]
+        if rule.kind == 'drop_if_lower':
+            if score < other:
+                current_grade -= score * weight
+                total_weight -= weight
+                dropped += (scheme.keys[rule.component],)
+        elif other > score:  # replace_if_higher
+            current_grade += (other - score) * weight
+
+    return current_grade, total_weight, dropped
+
+
+def calculate_grade(components, drop_midterm1_if_lower=False, scheme=None):
+    """
+    Calculate the grade based on received components.
+    If drop_midterm1_if_lower is True, it drops Midterm 1 if all midterms are present
+    and Midterm 1 score < Midterm 2 score.
+    Returns total points, effective weight, and the calculated percentage average.
+    """
+    current_grade, total_weight, _ = accumulate(components, drop_midterm1_if_lower, scheme)
+
+    if total_weight > 0:
+        current_percentage = current_grade / total_weight
+    else:
+        current_percentage = 0
+
+    return current_grade, total_weight, current_percentage
+
+
+def remaining_weight(total_weight, dropped=(), scheme=None):
+    """Weight still to be graded, excluding dropped components."""
+    scheme = scheme or DEFAULT_SCHEME
+    max_possible_weight = scheme.total_weight
+    for key in dropped:
+        max_possible_weight -= scheme.weight(key)
+    return max_possible_weight - total_weight
+
+
+def required_average(current_grade, total_weight, dropped, target_grade, curve_points=0, scheme=None):
+    """
+    Average score needed on the remaining assignments to reach target_grade.
+    Returns None when nothing is left to grade.
+    """
+    remaining = remaining_weight(total_weight, dropped, scheme)
+    if remaining <= WEIGHT_TOLERANCE:
+        return None
+
+    points_needed = target_grade - current_grade
+    adjusted_points_needed = points_needed - curve_points
+    return adjusted_points_needed / remaining
+
+
+def calculate_required_average(components, target_grade, drop_midterm1_if_lower=False, curve_points=0, scheme=None):
+    """Calculates the average score needed on remaining assignments."""
+    current_grade, total_weight, dropped = accumulate(components, drop_midterm1_if_lower, scheme)
+    return required_average(current_grade, total_weight, dropped, target_grade, curve_points, scheme)
+
+
+def required_average_grid(components, targets, curves, drop_midterm1_if_lower=False, scheme=None):
+    """
+    Required average for every (target, curve) combination.
+    Returns one list per target holding the required average for each curve value.
+    """
+    current_grade, total_weight, dropped = accumulate(components, drop_midterm1_if_lower, scheme)
+    return [
+        [required_average(current_grade, total_weight, dropped, target, curve, scheme) for curve in curves]
+        for target in targets
+    ]
+
+
+def calculate_grades_batch(rows, drop_midterm1_if_lower=False, scheme=None):
+    """
+    Grade a whole roster in one call.
+    rows is an iterable of component dictionaries shaped like calculate_grade's
+    input, or a Roster, which is read straight from its arrays.
+    Returns a list of (points, total_weight, percentage) tuples in roster order.
+    """
+    scheme = scheme or DEFAULT_SCHEME
+    results = []
+    append = results.append
+
+    if isinstance(rows, Roster) and rows.scheme is scheme:
+        rows, grade = rows.entries(), _accumulate
+    else:
+        grade = accumulate
+
+    for components in rows:
+        current_grade, total_weight, _ = grade(components, drop_midterm1_if_lower, scheme)
+        append((current_grade, total_weight, current_grade / total_weight if total_weight > 0 else 0))
+
+    return results
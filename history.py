@@ -0,0 +1,315 @@
+"""
+Per-student grade history in a local SQLite database.
+
+Each snapshot stores one student's grade inputs for one course (component
+scores, drop rules, target and curve) with the results the page showed for
+them. A snapshot is only written when the inputs or the student's section
+differ from the student's latest one, so saving on every page run adds a row
+per real change. That check is a plain read first: a page run that changed
+nothing never takes the write lock.
+
+The database runs in WAL mode, so page sessions read while another one
+writes. Snapshots are indexed by (student_id, course, id) and by
+(course, student_id, id): loading a student's latest state is one index
+lookup however many snapshots are stored, and a section report takes every
+student's latest snapshot in the course and keeps those in the section, so a
+student who moved section is only reported in the new one. A HistoryStore
+keeps a small pool of connections, and open_store() shares one store per
+database file between every session in the process.
+
+    python history.py import roster.csv --section A --target 80
+    python history.py show s123
+    python history.py section A -o latest.csv
+"""
+
+import argparse
+import csv
+import json
+import os
+import queue
+import sqlite3
+import sys
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from functools import lru_cache
+
+from gradebook import ID_FIELD, detect_format, parse_components, read_records
+from grading import accumulate
+from parallel import chunked
+from prediction import normalize, predict
+from schemes import DEFAULT_SCHEME, get_scheme
+
+HISTORY_FILE = os.environ.get('GRADE_CALC_HISTORY_FILE', 'grade_history.db')
+
+# Connections kept open per store; sessions beyond this open and close their own
+POOL_SIZE = 4
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    student_id TEXT NOT NULL,
+    course TEXT NOT NULL,
+    section TEXT NOT NULL DEFAULT '',
+    saved_at REAL NOT NULL,
+    state TEXT NOT NULL,
+    current_grade REAL NOT NULL,
+    completed_weight REAL NOT NULL,
+    required_average REAL,
+    final_grade REAL,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_by_student ON snapshots (student_id, course, id);
+CREATE INDEX IF NOT EXISTS snapshots_by_course ON snapshots (course, student_id, id);
+"""
+
+COLUMNS = ('id', 'student_id', 'course', 'section', 'saved_at', 'state', 'current_grade',
+           'completed_weight', 'required_average', 'final_grade', 'status')
+
+Snapshot = namedtuple('Snapshot', [
+    'id', 'student_id', 'course', 'section', 'saved_at',
+    'components',        # {key: (score, received)}, scores of missing grades zeroed
+    'drop', 'target', 'curve',
+    'current_grade',     # points earned, as accumulate() returns them
+    'completed_weight',
+    'required_average',  # None once every relevant grade is entered
+    'final_grade',       # None while work remains
+    'status',            # as in prediction.Prediction
+])
+
+CSV_FIELDS = (ID_FIELD, 'section', 'saved_at', 'current_average', 'completed_weight',
+              'required_average', 'final_grade', 'status', 'target', 'curve')
+
+
+def encode_state(components, drop_midterm1_if_lower, target_grade, curve_points, scheme=None):
+    """Canonical JSON of a grade state; equal inputs give equal text."""
+    scheme = scheme or DEFAULT_SCHEME
+    state, drop, target, curve, _ = normalize(components, drop_midterm1_if_lower, target_grade, curve_points, scheme)
+    return json.dumps({'components': dict(zip(scheme.keys, state)), 'drop': drop, 'target': target, 'curve': curve},
+                      separators=(',', ':'))
+
+
+def _snapshot(row):
+    fields = dict(zip(COLUMNS, row))
+    state = json.loads(fields.pop('state'))
+    components = {key: (score, received) for key, (score, received) in state['components'].items()}
+    return Snapshot(components=components, drop=state['drop'], target=state['target'], curve=state['curve'], **fields)
+
+
+class HistoryStore:
+    def __init__(self, path=HISTORY_FILE, pool_size=POOL_SIZE):
+        self.path = str(path)
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        with self.connection() as connection:
+            connection.executescript(SCHEMA)
+
+    def _connect(self):
+        # Autocommit mode; writes open their own transactions
+        connection = sqlite3.connect(self.path, timeout=10.0, isolation_level=None, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    @contextmanager
+    def connection(self):
+        """A pooled connection, returned to the pool afterwards."""
+        try:
+            connection = self._pool.get_nowait()
+        except queue.Empty:
+            connection = self._connect()
+        try:
+            yield connection
+        finally:
+            try:
+                self._pool.put_nowait(connection)
+            except queue.Full:
+                connection.close()
+
+    @contextmanager
+    def _transaction(self):
+        with self.connection() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def _unchanged(connection, student_id, course, state, section):
+        latest = connection.execute(
+            "SELECT state, section FROM snapshots WHERE student_id = ? AND course = ? ORDER BY id DESC LIMIT 1",
+            (student_id, course)).fetchone()
+        return latest == (state, section)
+
+    def _save(self, connection, student_id, components, drop, target, curve, scheme, section, saved_at, state=None):
+        state = state or encode_state(components, drop, target, curve, scheme)
+        if self._unchanged(connection, student_id, scheme.id, state, section):
+            return None
+
+        current_grade, total_weight, _ = accumulate(components, drop, scheme)
+        prediction = predict(components, drop, target, curve, scheme)
+        cursor = connection.execute(
+            f"INSERT INTO snapshots ({', '.join(COLUMNS[1:])}) VALUES ({', '.join('?' * (len(COLUMNS) - 1))})",
+            (student_id, scheme.id, section, time.time() if saved_at is None else saved_at, state, current_grade,
+             total_weight, prediction.required_average, prediction.final_grade, prediction.status))
+        return cursor.lastrowid
+
+    def save(self, student_id, components, drop_midterm1_if_lower, target_grade, curve_points=0,
+             scheme=None, section='', saved_at=None):
+        """
+        Store a snapshot of the student's inputs and results for the scheme's
+        course. Returns the new snapshot id, or None when nothing changed since
+        the latest snapshot.
+        """
+        scheme = scheme or DEFAULT_SCHEME
+        state = encode_state(components, drop_midterm1_if_lower, target_grade, curve_points, scheme)
+        # Most page runs change nothing; find that out without the write lock
+        with self.connection() as connection:
+            if self._unchanged(connection, student_id, scheme.id, state, section):
+                return None
+        with self._transaction() as connection:
+            return self._save(connection, student_id, components, drop_midterm1_if_lower, target_grade,
+                              curve_points, scheme, section, saved_at, state)
+
+    def import_records(self, records, target_grade, curve_points=0, drop_midterm1_if_lower=False,
+                       scheme=None, section='', chunk_size=10_000):
+        """Save a snapshot for every raw gradebook record, a transaction per chunk. Returns (saved, unchanged)."""
+        scheme = scheme or DEFAULT_SCHEME
+        saved = unchanged = 0
+        saved_at = time.time()
+        for chunk in chunked(enumerate(records, 1), chunk_size):
+            with self._transaction() as connection:
+                for row, record in chunk:
+                    student_id, components = parse_components(record, scheme, row)
+                    if self._save(connection, student_id, components, drop_midterm1_if_lower, target_grade,
+                                  curve_points, scheme, section, saved_at) is None:
+                        unchanged += 1
+                    else:
+                        saved += 1
+        return saved, unchanged
+
+    def latest(self, student_id, course):
+        """The student's most recent Snapshot for the course, or None."""
+        with self.connection() as connection:
+            row = connection.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM snapshots WHERE student_id = ? AND course = ? ORDER BY id DESC LIMIT 1",
+                (student_id, course)).fetchone()
+        return None if row is None else _snapshot(row)
+
+    def history(self, student_id, course, limit=None):
+        """The student's snapshots for the course, oldest first; the last limit of them if given."""
+        with self.connection() as connection:
+            rows = connection.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM snapshots WHERE student_id = ? AND course = ? ORDER BY id DESC LIMIT ?",
+                (student_id, course, -1 if limit is None else limit)).fetchall()
+        return [_snapshot(row) for row in reversed(rows)]
+
+    def section_latest(self, course, section=None):
+        """
+        The latest Snapshot of every student in the course, by student id; with
+        a section, only the students whose latest snapshot is in it.
+        """
+        where, params = ("", (course,)) if section is None else (" AND section = ?", (course, section))
+        with self.connection() as connection:
+            rows = connection.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM snapshots WHERE id IN "
+                f"(SELECT MAX(id) FROM snapshots WHERE course = ? GROUP BY student_id){where} ORDER BY student_id",
+                params).fetchall()
+        return [_snapshot(row) for row in rows]
+
+    def count(self):
+        with self.connection() as connection:
+            return connection.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0]
+
+
+@lru_cache(maxsize=None)
+def open_store(path=HISTORY_FILE):
+    """The process-wide HistoryStore for a database file, shared by every page session."""
+    return HistoryStore(path)
+
+
+def snapshot_row(snapshot):
+    """A CSV_FIELDS dictionary for reports."""
+    return {
+        ID_FIELD: snapshot.student_id,
+        'section': snapshot.section,
+        'saved_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(snapshot.saved_at)),
+        'current_average': (round(snapshot.current_grade / snapshot.completed_weight, 2)
+                            if snapshot.completed_weight > 0 else ''),
+        'completed_weight': snapshot.completed_weight,
+        'required_average': '' if snapshot.required_average is None else round(snapshot.required_average, 2),
+        'final_grade': '' if snapshot.final_grade is None else round(snapshot.final_grade, 2),
+        'status': snapshot.status,
+        'target': snapshot.target,
+        'curve': snapshot.curve,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Save and report per-student grade history.")
+    parser.add_argument('--db', default=HISTORY_FILE, help=f"history database (default {HISTORY_FILE})")
+    parser.add_argument('--scheme', help="grading scheme id or scheme file (default: the syllabus course)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = commands.add_parser('import', help="save a snapshot for every student in a gradebook export")
+    import_parser.add_argument('input', help="gradebook export (CSV or JSONL, see gradebook.py)")
+    import_parser.add_argument('--input-format', choices=('csv', 'jsonl'), help="defaults to the input file extension")
+    import_parser.add_argument('--section', default='', help="section the students belong to")
+    import_parser.add_argument('--target', type=float, default=80.0, help="target overall grade (%%)")
+    import_parser.add_argument('--curve', type=float, default=0.0, help="potential curve adjustment (points)")
+    import_parser.add_argument('--drop-mid1', action='store_true', help="apply the scheme's optional drop rules")
+
+    show_parser = commands.add_parser('show', help="one student's snapshots, oldest first")
+    show_parser.add_argument('student_id')
+    show_parser.add_argument('-o', '--output', default='-', help="CSV file, or - for stdout (default)")
+
+    section_parser = commands.add_parser('section', help="the latest snapshot of every student in a section")
+    section_parser.add_argument('section', nargs='?', help="section name (default: the whole course)")
+    section_parser.add_argument('-o', '--output', default='-', help="CSV file, or - for stdout (default)")
+    args = parser.parse_args(argv)
+
+    scheme = get_scheme(args.scheme)
+    start = time.perf_counter()
+    with HistoryStore(args.db) as store:
+        if args.command == 'import':
+            with open(args.input, newline='', encoding='utf-8') as source:
+                saved, unchanged = store.import_records(
+                    read_records(source, args.input_format or detect_format(args.input)),
+                    args.target, args.curve, args.drop_mid1, scheme, args.section)
+            print(f"Saved {saved} snapshots ({unchanged} students unchanged) in {time.perf_counter() - start:.2f}s; "
+                  f"{store.count()} in {args.db}", file=sys.stderr)
+            return
+
+        if args.command == 'show':
+            snapshots = store.history(args.student_id, scheme.id)
+        else:
+            snapshots = store.section_latest(scheme.id, args.section)
+
+    sink = sys.stdout if args.output == '-' else open(args.output, 'w', newline='', encoding='utf-8')
+    try:
+        writer = csv.DictWriter(sink, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        writer.writerows(snapshot_row(snapshot) for snapshot in snapshots)
+    finally:
+        if sink is not sys.stdout:
+            sink.close()
+    print(f"{len(snapshots)} snapshots in {(time.perf_counter() - start) * 1000:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
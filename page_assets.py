@@ -0,0 +1,52 @@
+"""
+Static page content, built once per process.
+
+Streamlit re-executes calculator.py on every rerun, but imported modules are
+only loaded once, so the stylesheet and the per-scheme markdown live here
+instead of being rebuilt inline on each run.
+"""
+
+from functools import lru_cache
+
+from schemes import DEFAULT_SCHEME
+
+# Dark theme
+PAGE_CSS = """
+<style>
+    .stApp {
+        background-color: #1E1E1E;
+    }
+    .stNumberInput, .stTextInput, .stSelectbox {
+        background-color: #2E2E2E;
+    }
+    /* Text colors */
+    .stMarkdown, .stText, .stTitle, .stSubheader, .stNumberInput label, 
+    .stTextInput label, .stSelectbox label, .stRadio label, .stCheckbox label {
+        color: #FFFFFF !important;
+    }
+    /* Input text colors */
+    .stNumberInput input, .stTextInput input {
+        color: #FFFFFF !important;
+    }
+    /* Checkbox and radio colors */
+    .stCheckbox .stCheckbox, .stRadio .stRadio {
+        color: #FFFFFF !important;
+    }
+    /* Sidebar colors */
+    .css-1d391kg, .css-1v0mbdj {
+        background-color: #1E1E1E !important;
+    }
+</style>
+"""
+
+
+@lru_cache(maxsize=None)
+def cutoffs_markdown(scheme=None):
+    """The "Approximate Grade Cutoffs" list for a scheme."""
+    scheme = scheme or DEFAULT_SCHEME
+    lines = [f"- {c.grade}: {c.min:g}%" + (f" ({c.note})" if c.note else "") for c in scheme.cutoffs]
+    if scheme.cutoffs:
+        lines.append(f"- F: Below {scheme.cutoffs[-1].min:g}%")
+    if scheme.cutoff_note:
+        lines += ["", scheme.cutoff_note]
+    return "\n".join(lines)
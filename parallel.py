@@ -0,0 +1,143 @@
+"""
+Multi-core roster grading and prediction.
+
+The roster's (scores, has_grade) matrices are written once to memory-mapped
+scratch files, along with files for the results. Each worker task is only a
+row range: the worker maps the files, grades its rows with the vectorized
+engine and writes the results in place. Nothing per student is pickled, and
+the results are returned still mapped, so the parent's serial work is one
+copy of the input matrices. Component dictionaries are converted to matrices
+first; pass a Roster or the matrices to skip that step. NumPy is only
+imported by these functions, so the streaming helpers stay light for
+gradebook.py and history.py.
+
+chunked() and imap_ordered() are the bounded fan-out used for streamed
+exports (gradebook.py --workers).
+"""
+
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from grading import CUTOFFS
+
+DEFAULT_CHUNK_SIZE = 10_000
+
+# Scratch files shared with the workers live in memory where the OS offers it
+SHARED_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+# Rows per task for the memory-mapped paths; big enough that a task's
+# NumPy work dwarfs the cost of scheduling it
+MATRIX_CHUNK_SIZE = 100_000
+
+
+def chunked(iterable, size):
+    """Yield lists of up to size items from iterable."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def imap_ordered(executor, func, chunks, max_pending):
+    """
+    Like executor.map, but only keeps max_pending chunks in flight, so an
+    unbounded stream of chunks can be processed with bounded memory.
+    """
+    pending = []
+    for chunk in chunks:
+        pending.append(executor.submit(func, chunk))
+        if len(pending) >= max_pending:
+            yield pending.pop(0).result()
+    for future in pending:
+        yield future.result()
+
+
+def _map(directory, name, shape, dtype, mode='w+'):
+    """A NumPy array backed by a file in the shared directory."""
+    import numpy as np
+
+    if not all(shape):
+        return np.zeros(shape, dtype)  # mmap cannot map an empty file
+    return np.memmap(os.path.join(directory, name), dtype=dtype, mode=mode, shape=shape)
+
+
+def _grade_range(task):
+    from vectorized import accumulate_matrix, percentages
+
+    directory, n, width, start, stop, drop_midterm1_if_lower, scheme = task
+    rows = slice(start, stop)
+    scores = _map(directory, 'scores', (n, width), 'f8', 'r')[rows]
+    has_grade = _map(directory, 'has_grade', (n, width), '?', 'r')[rows]
+    points, total_weight, percentage = (_map(directory, name, (n,), 'f8', 'r+')[rows]
+                                        for name in ('points', 'total_weight', 'percentage'))
+    points[:], total_weight[:], _ = accumulate_matrix(scores, has_grade, drop_midterm1_if_lower, scheme)
+    percentage[:] = percentages(points, total_weight)
+
+
+def _grid_range(task):
+    from vectorized import required_average_grids
+
+    directory, n, width, start, stop, targets, curves, drop_midterm1_if_lower, scheme = task
+    rows = slice(start, stop)
+    scores = _map(directory, 'scores', (n, width), 'f8', 'r')[rows]
+    has_grade = _map(directory, 'has_grade', (n, width), '?', 'r')[rows]
+    grids = _map(directory, 'grids', (n, len(targets), len(curves)), 'f8', 'r+')[rows]
+    required_average_grids(scores, has_grade, targets, curves, drop_midterm1_if_lower, scheme, out=grids)
+
+
+def _run_ranges(func, scores, has_grade, outputs, arguments, workers, chunk_size):
+    """
+    Write the matrices to the shared directory, create the output files, given
+    as {name: shape} of float arrays, run func over row ranges and return the
+    outputs. They stay mapped after the files are removed, so nothing is copied back.
+    """
+    import numpy as np
+
+    n, width = scores.shape
+    workers = workers or os.cpu_count()
+    with tempfile.TemporaryDirectory(prefix='grades-', dir=SHARED_DIR, ignore_cleanup_errors=True) as directory:
+        _map(directory, 'scores', (n, width), 'f8')[:] = scores
+        _map(directory, 'has_grade', (n, width), '?')[:] = has_grade
+        results = [np.asarray(_map(directory, name, shape, 'f8')) for name, shape in outputs.items()]
+        tasks = ((directory, n, width, start, min(start + chunk_size, n), *arguments) for start in range(0, n, chunk_size))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for _ in imap_ordered(executor, func, tasks, 2 * workers):
+                pass
+    return results
+
+
+def _matrices(roster, scheme):
+    from vectorized import to_matrix
+
+    return roster if isinstance(roster, tuple) else to_matrix(roster, scheme)
+
+
+def calculate_grades_parallel(roster, drop_midterm1_if_lower=False, workers=None, chunk_size=MATRIX_CHUNK_SIZE,
+                              scheme=None):
+    """
+    vectorized.calculate_grades_vectorized across a process pool.
+    roster is a (scores, has_grade) pair of matrices, a Roster or component
+    dictionaries. workers defaults to the number of CPUs. Returns (points,
+    total_weight, percentage) arrays in roster order.
+    """
+    scores, has_grade = _matrices(roster, scheme)
+    outputs = {name: (len(scores),) for name in ('points', 'total_weight', 'percentage')}
+    return tuple(_run_ranges(_grade_range, scores, has_grade, outputs, (drop_midterm1_if_lower, scheme),
+                             workers, chunk_size))
+
+
+def required_average_grids_parallel(roster, targets=tuple(CUTOFFS.values()), curves=(0.0,),
+                                    drop_midterm1_if_lower=False, workers=None, chunk_size=MATRIX_CHUNK_SIZE,
+                                    scheme=None):
+    """
+    grading.required_average_grid for every student, computed across a process pool.
+    roster is as for calculate_grades_parallel and targets default to the grade
+    cutoffs. Returns an (N x targets x curves) array, NaN where nothing is left
+    to grade.
+    """
+    targets, curves = tuple(targets), tuple(curves)
+    scores, has_grade = _matrices(roster, scheme)
+    outputs = {'grids': (len(scores), len(targets), len(curves))}
+    return _run_ranges(_grid_range, scores, has_grade, outputs, (targets, curves, drop_midterm1_if_lower, scheme),
+                       workers, chunk_size)[0]
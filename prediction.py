@@ -0,0 +1,141 @@
+"""
+Prediction step of the page, memoized process-wide.
+
+Streamlit reruns the whole script on every widget change, including ones that
+do not touch the grades (like toggling the cutoff display). predict() returns
+the required average plus the already formatted text the page shows, and
+cached_predict() keeps recent results in a bounded LRU cache keyed on the
+normalized grade state, shared by every session in the process.
+"""
+
+import os
+from collections import namedtuple
+from functools import lru_cache
+
+from grading import accumulate, remaining_weight, required_average
+from schemes import DEFAULT_SCHEME
+
+# Number of distinct grade states to keep, tune with the hit rate from cache_stats()
+PREDICTION_CACHE_SIZE = int(os.environ.get('GRADE_CALC_PREDICTION_CACHE_SIZE', 4096))
+
+Prediction = namedtuple('Prediction', [
+    'status',            # 'impossible', 'met' or 'needed' while work remains; 'final_met' or 'final_below' once complete
+    'required_average',  # None once every relevant grade is entered
+    'final_grade',       # None while work remains
+    'metric',            # formatted value for st.metric
+    'intro',             # line shown above the metric
+    'remaining',         # lines describing the remaining assignments
+    'message',           # status message text
+])
+
+
+def normalize(components, drop_midterm1_if_lower, target_grade, curve_points, scheme=None):
+    """
+    Hashable key for a grade state. Scores of components that have not been
+    received do not affect any result, so they are zeroed out.
+    """
+    scheme = scheme or DEFAULT_SCHEME
+    state = tuple(
+        (float(score) if has_grade else 0.0, bool(has_grade))
+        for score, has_grade in (components[key] for key in scheme.keys)
+    )
+    return state, bool(drop_midterm1_if_lower), float(target_grade), float(curve_points), scheme
+
+
+def predict(components, drop_midterm1_if_lower, target_grade, curve_points=0, scheme=None):
+    """Compute the prediction shown under "Show what's needed to reach target grade"."""
+    scheme = scheme or DEFAULT_SCHEME
+    current_grade, total_weight, dropped = accumulate(components, drop_midterm1_if_lower, scheme)
+    required_average_on_remaining = required_average(current_grade, total_weight, dropped, target_grade, curve_points, scheme)
+
+    if required_average_on_remaining is None:
+        # Calculate final grade considering potential curve
+        final_grade_with_curve = current_grade + curve_points
+        final_grade_percentage = (final_grade_with_curve / total_weight) if total_weight > 0 else 0
+        if final_grade_percentage >= target_grade:
+            status = 'final_met'
+            message = f"Your final grade (with potential curve) meets or exceeds your target of {target_grade:.2f}%!"
+        else:
+            status = 'final_below'
+            message = f"Your final grade (with potential curve) is below your target of {target_grade:.2f}%."
+        return Prediction(status, None, final_grade_percentage, f"{final_grade_percentage:.2f}%", "", (), message)
+
+    # Mention the curve adjustment if it's non-zero
+    curve_text = f" (considering a {curve_points:.2f} point potential curve adjustment)" if curve_points > 0 else ""
+    intro = f"To reach your target grade of **{target_grade:.2f}%**{curve_text}, you need an average score of:"
+
+    remaining_assignments = [
+        f"{component.name} ({component.weight*100:.0f}%)"
+        for component in scheme.components
+        if not components[component.key][1] and component.key not in dropped
+    ]
+    remaining = ()
+    if remaining_assignments:
+        remaining = (
+            f"*Remaining assignments contributing {remaining_weight(total_weight, dropped, scheme)*100:.0f}% to the total grade:*",
+            f"  - {', '.join(remaining_assignments)}",
+        )
+
+    if required_average_on_remaining > 100:
+        status = 'impossible'
+        message = f"⚠️ Even with the potential curve adjustment, achieving an average of {required_average_on_remaining:.2f}% on the remaining assignments is impossible (max is 100%). You may need to adjust your target or curve assumption."
+    elif required_average_on_remaining < 0:
+        status = 'met'
+        message = f"🎉 With the potential curve adjustment considered, you've already met or exceeded your target grade of {target_grade:.2f}%!"
+    else:
+        status = 'needed'
+        message = f"This adjusted average score of {required_average_on_remaining:.2f}% across the remaining assignments is needed to reach your goal{curve_text}."
+
+    return Prediction(status, required_average_on_remaining, None, f"{required_average_on_remaining:.2f}%", intro, remaining, message)
+
+
+def rule_messages(components, drop_midterm1_if_lower, scheme=None):
+    """One line per active drop/replace rule saying whether it changed the grade."""
+    scheme = scheme or DEFAULT_SCHEME
+    _, _, dropped = accumulate(components, drop_midterm1_if_lower, scheme)
+    messages = []
+    for rule in scheme.rules:
+        if rule.optional and not drop_midterm1_if_lower:
+            continue
+        if not all(components[scheme.keys[i]][1] for i in rule.requires):
+            continue
+        component, other = scheme.components[rule.component], scheme.components[rule.compare_to]
+        score, other_score = components[component.key][0], components[other.key][0]
+        if rule.kind == 'drop_if_lower':
+            if component.key in dropped:
+                messages.append(f"*{component.name} ({score:.2f}%) dropped (was lower than {other.name}: {other_score:.2f}%).*")
+            else:
+                messages.append(f"*{component.name} ({score:.2f}%) not dropped (not lower than {other.name}: {other_score:.2f}%).*")
+        elif other_score > score:
+            messages.append(f"*{component.name} ({score:.2f}%) replaced by {other.name} ({other_score:.2f}%).*")
+        else:
+            messages.append(f"*{component.name} ({score:.2f}%) not replaced (not lower than {other.name}: {other_score:.2f}%).*")
+    return messages
+
+
+@lru_cache(maxsize=PREDICTION_CACHE_SIZE)
+def _predict_cached(state, drop_midterm1_if_lower, target_grade, curve_points, scheme):
+    return predict(dict(zip(scheme.keys, state)), drop_midterm1_if_lower, target_grade, curve_points, scheme)
+
+
+def cached_predict(components, drop_midterm1_if_lower, target_grade, curve_points=0, scheme=None):
+    """predict(), served from the process-wide LRU cache when the state has been seen before."""
+    return _predict_cached(*normalize(components, drop_midterm1_if_lower, target_grade, curve_points, scheme))
+
+
+def cache_stats():
+    """Hit/miss counters of the prediction cache."""
+    info = _predict_cached.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        'hits': info.hits,
+        'misses': info.misses,
+        'size': info.currsize,
+        'maxsize': info.maxsize,
+        'hit_rate': info.hits / lookups if lookups else 0.0,
+    }
+
+
+def clear_cache():
+    """Empty the prediction cache and reset its counters."""
+    _predict_cached.cache_clear()
@@ -0,0 +1,133 @@
+"""
+Compact student records for large batches.
+
+Everywhere else a student is a dictionary mapping each component key to a
+(score, has_grade) tuple: a dict, a tuple per component and their floats, a few
+hundred bytes per student. Two compact alternatives:
+
+- StudentRecord holds one student in a __slots__ object: the scores in an
+  array('d') in scheme component order and the has-grade flags in an int
+  bitmask, where bit i is component i.
+- Roster holds a whole roster as a struct of arrays: one flat array('d') of
+  scores, N x components in component order, and one array of bitmasks. That is
+  8 bytes per score plus 1 byte per student for up to 8 components.
+
+Both read like the dictionary (record[key] == (score, has_grade)), so every
+grading function accepts them. grading.accumulate, calculate_grades_batch and
+vectorized.to_matrix read the arrays directly.
+"""
+
+from array import array
+from collections.abc import Mapping
+
+from schemes import DEFAULT_SCHEME
+
+
+def mask_typecode(count):
+    """Smallest unsigned array typecode with a bit for each of count components."""
+    for typecode in 'BHLQ':
+        if count <= array(typecode).itemsize * 8:
+            return typecode
+    raise ValueError(f"Compact records support at most 64 components, not {count}")
+
+
+def _pack(components, scheme, scores):
+    """Append a student's scores to `scores` and return the has-grade bitmask."""
+    received = 0
+    for i, key in enumerate(scheme.keys):
+        score, has_grade = components[key]
+        scores.append(score)
+        if has_grade:
+            received |= 1 << i
+    return received
+
+
+class StudentRecord(Mapping):
+    __slots__ = ('scheme', 'scores', 'received', 'student_id')
+
+    def __init__(self, scores, received, scheme=None, student_id=None):
+        self.scheme = scheme or DEFAULT_SCHEME
+        self.scores = scores if isinstance(scores, array) else array('d', scores)
+        self.received = received
+        self.student_id = student_id
+        if len(self.scores) != len(self.scheme.keys):
+            raise ValueError(f"Expected {len(self.scheme.keys)} scores, got {len(self.scores)}")
+
+    @classmethod
+    def from_components(cls, components, scheme=None, student_id=None):
+        """Pack a component dictionary."""
+        scheme = scheme or DEFAULT_SCHEME
+        scores = array('d')
+        received = _pack(components, scheme, scores)
+        return cls(scores, received, scheme, student_id)
+
+    def entries(self):
+        """(score, has_grade) for every component, in scheme order."""
+        received = self.received
+        return [(score, received >> i & 1 == 1) for i, score in enumerate(self.scores)]
+
+    def __getitem__(self, key):
+        i = self.scheme.index[key]
+        return self.scores[i], self.received >> i & 1 == 1
+
+    def __iter__(self):
+        return iter(self.scheme.keys)
+
+    def __len__(self):
+        return len(self.scheme.keys)
+
+    def __repr__(self):
+        return f"StudentRecord({self.student_id!r}, {dict(self)})"
+
+
+class Roster:
+    __slots__ = ('scheme', 'scores', 'received', 'student_ids')
+
+    def __init__(self, scheme=None, keep_ids=True):
+        self.scheme = scheme or DEFAULT_SCHEME
+        self.scores = array('d')
+        self.received = array(mask_typecode(len(self.scheme.keys)))
+        self.student_ids = [] if keep_ids else None
+
+    @classmethod
+    def from_rows(cls, rows, scheme=None, student_ids=None):
+        """Pack component dictionaries, with optional matching student ids."""
+        roster = cls(scheme, keep_ids=student_ids is not None)
+        ids = iter(student_ids) if student_ids is not None else None
+        for components in rows:
+            roster.append(components, next(ids) if ids is not None else None)
+        return roster
+
+    def append(self, components, student_id=None):
+        self.received.append(_pack(components, self.scheme, self.scores))
+        if self.student_ids is not None:
+            self.student_ids.append(student_id)
+
+    def entries(self):
+        """Yield each student's (score, has_grade) list in scheme order, without building records."""
+        width = len(self.scheme.keys)
+        scores = self.scores
+        bits = range(width)
+        for row, received in enumerate(self.received):
+            base = row * width
+            yield [(scores[base + i], received >> i & 1 == 1) for i in bits]
+
+    def nbytes(self):
+        """Bytes held by the score and bitmask arrays."""
+        return len(self.scores) * self.scores.itemsize + len(self.received) * self.received.itemsize
+
+    def __len__(self):
+        return len(self.received)
+
+    def __getitem__(self, row):
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("Roster index out of range")
+        width = len(self.scheme.keys)
+        student_id = self.student_ids[row] if self.student_ids is not None else None
+        return StudentRecord(self.scores[row * width:(row + 1) * width], self.received[row], self.scheme, student_id)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
@@ -0,0 +1,36 @@
+"""
+Sample students and random rosters shared by the tests and benchmarks.
+"""
+
+import numpy as np
+
+from grading import COMPONENTS
+
+# Homework, discussion and two midterms in; Midterm 3 and the final to go
+PARTIAL = {
+    'homework': (100, True), 'discussion': (100, True),
+    'mid1': (80, True), 'mid2': (80, True),
+    'mid3': (0, False), 'final': (0, False)
+}
+
+# Everything but the final in, with Midterm 1 the lowest midterm
+FINAL_REMAINING = {
+    'homework': (100, True), 'discussion': (100, True),
+    'mid1': (70, True), 'mid2': (90, True), 'mid3': (80, True), 'final': (0, False)
+}
+
+
+def random_roster(n, seed=0):
+    """Random (scores, has_grade) matrices for n students."""
+    rng = np.random.default_rng(seed)
+    scores = rng.uniform(0, 100, size=(n, len(COMPONENTS))).round(2)
+    has_grade = rng.random((n, len(COMPONENTS))) < 0.8
+    return scores, has_grade
+
+
+def to_rows(scores, has_grade):
+    """Matrix roster as the component dictionaries calculate_grade takes."""
+    return [
+        dict(zip(COMPONENTS, zip(score_row, has_row)))
+        for score_row, has_row in zip(scores.tolist(), has_grade.tolist())
+    ]
@@ -0,0 +1,156 @@
+"""
+What-if scenario matrix: every target x curve combination in one pass.
+
+For each student the grid holds the required average on the remaining work
+(or the final grade once everything is in) and the same status the page's
+prediction shows: 'impossible' above 100%, 'met' below 0%, 'needed' otherwise,
+and 'final_met'/'final_below' once every relevant grade is entered. The whole
+(students x targets x curves) grid is one NumPy broadcast using the same
+operations as grading.required_average, so each cell equals the page's value.
+
+    python scenarios.py advisees.csv --targets 70,80,90 --curves 0:5:1 -o scenarios.csv
+
+writes one row per student, target and curve for advisors.
+"""
+
+import argparse
+import csv
+import io
+import sys
+import time
+
+import numpy as np
+
+from analytics import parse_sweep
+from gradebook import ID_FIELD, detect_format, load_roster, read_records
+from grading import WEIGHT_TOLERANCE
+from parallel import chunked
+from schemes import DEFAULT_SCHEME, get_scheme
+from vectorized import accumulate_matrix, remaining_weights, to_matrix
+
+STATUS_LABELS = {
+    'impossible': "Impossible",
+    'met': "Already met",
+    'needed': "Needed",
+    'final_met': "Final meets target",
+    'final_below': "Final below target",
+}
+
+# Cell backgrounds for the page's table
+STATUS_COLORS = {
+    'impossible': 'rgba(255, 75, 75, 0.35)',
+    'met': 'rgba(33, 195, 84, 0.35)',
+    'needed': 'rgba(255, 189, 69, 0.25)',
+    'final_met': 'rgba(33, 195, 84, 0.35)',
+    'final_below': 'rgba(255, 75, 75, 0.35)',
+}
+
+# Largest grid the page will show
+MAX_PAGE_CELLS = 2_500
+
+CSV_FIELDS = (ID_FIELD, 'target', 'curve', 'required_average', 'final_grade', 'status')
+
+
+def scenario_grid(scores, has_grade, targets, curves, drop_midterm1_if_lower=False, scheme=None):
+    """
+    (values, statuses) arrays of shape (students, targets, curves). values is
+    the required average where work remains and the final grade with the curve
+    once it is all in.
+    """
+    scheme = scheme or DEFAULT_SCHEME
+    targets = np.asarray(targets, dtype=float)[None, :, None]
+    curves = np.asarray(curves, dtype=float)[None, None, :]
+    points, total_weight, dropped = accumulate_matrix(scores, has_grade, drop_midterm1_if_lower, scheme, by_component=True)
+
+    remaining = remaining_weights(total_weight, dropped, scheme)[:, None, None]
+    points = points[:, None, None]
+    total_weight = total_weight[:, None, None]
+
+    open_work = remaining > WEIGHT_TOLERANCE
+    with np.errstate(divide='ignore', invalid='ignore'):
+        required = ((targets - points) - curves) / remaining
+        final = np.where(total_weight > 0, (points + curves) / total_weight, 0.0)
+
+    values = np.where(open_work, required, final)
+    statuses = np.select(
+        [open_work & (required > 100), open_work & (required < 0), open_work, final >= targets],
+        ['impossible', 'met', 'needed', 'final_met'],
+        'final_below',
+    )
+    return values, statuses
+
+
+def student_grid(components, targets, curves, drop_midterm1_if_lower=False, scheme=None):
+    """scenario_grid for one student given as a component dictionary: (targets x curves) arrays."""
+    values, statuses = scenario_grid(*to_matrix([components], scheme), targets, curves, drop_midterm1_if_lower, scheme)
+    return values[0], statuses[0]
+
+
+def grid_table(values, statuses, targets, curves):
+    """Rows for a table with one row per target and one column per curve."""
+    return [
+        {'Target': f"{target:.2f}%",
+         **{f"Curve +{curve:g}": f"{value:.2f}% · {STATUS_LABELS[status]}" for curve, value, status in zip(curves, row, status_row)}}
+        for target, row, status_row in zip(targets, values.tolist(), statuses.tolist())
+    ]
+
+
+def grid_styles(statuses):
+    """CSS for each cell of grid_table, colored by status."""
+    return [[f"background-color: {STATUS_COLORS[status]}" for status in row] for row in statuses.tolist()]
+
+
+def grid_records(values, statuses, targets, curves, student_id=''):
+    """One CSV_FIELDS dictionary per target and curve."""
+    for target, row, status_row in zip(targets, values.tolist(), statuses.tolist()):
+        for curve, value, status in zip(curves, row, status_row):
+            final = status.startswith('final')
+            yield {ID_FIELD: student_id, 'target': target, 'curve': curve,
+                   'required_average': '' if final else value, 'final_grade': value if final else '', 'status': status}
+
+
+def grid_csv(values, statuses, targets, curves, student_id=''):
+    """CSV text of grid_records, for a download button."""
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    writer.writerows(grid_records(values, statuses, targets, curves, student_id))
+    return out.getvalue()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Required average for every target and curve, for every student in an export.")
+    parser.add_argument('input', help="gradebook export (CSV or JSONL, see gradebook.py)")
+    parser.add_argument('-o', '--output', default='-', help="CSV results file, or - for stdout (default)")
+    parser.add_argument('--input-format', choices=('csv', 'jsonl'), help="defaults to the input file extension")
+    parser.add_argument('--targets', default='50,70,80,90', help="target grades as a list or start:stop:step")
+    parser.add_argument('--curves', default='0,2.5,5', help="curve points as a list or start:stop:step")
+    parser.add_argument('--drop-mid1', action='store_true', help="apply the scheme's optional drop rules")
+    parser.add_argument('--scheme', help="grading scheme id or scheme file (default: the syllabus course)")
+    args = parser.parse_args(argv)
+
+    scheme = get_scheme(args.scheme)
+    targets, curves = parse_sweep(args.targets), parse_sweep(args.curves)
+    sink = sys.stdout if args.output == '-' else open(args.output, 'w', newline='', encoding='utf-8')
+    start = time.perf_counter()
+    count = 0
+    try:
+        writer = csv.DictWriter(sink, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        with open(args.input, newline='', encoding='utf-8') as source:
+            for records in chunked(read_records(source, args.input_format or detect_format(args.input)), 10_000):
+                roster = load_roster(records, scheme)
+                values, statuses = scenario_grid(*to_matrix(roster, scheme), targets, curves, args.drop_mid1, scheme)
+                for student_id, student_values, student_statuses in zip(roster.student_ids, values, statuses):
+                    writer.writerows(grid_records(student_values, student_statuses, targets, curves, student_id))
+                count += len(roster)
+    finally:
+        if sink is not sys.stdout:
+            sink.close()
+
+    print(f"Wrote {count} students x {len(targets) * len(curves)} scenarios in {time.perf_counter() - start:.2f}s",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
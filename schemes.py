@@ -0,0 +1,224 @@
+"""
+Data-driven grading schemes.
+
+A scheme file (JSON, or YAML when PyYAML is installed) declares a course's
+components, weights, drop/replace rules and grade cutoffs. load_scheme()
+compiles it once per process into an immutable Scheme: a weight vector indexed
+like the component list and a tuple of compiled rules that the grading loop
+runs in order. See schemes/default.json for the course in syllabus.md.
+
+Rule kinds:
+- drop_if_lower: remove `component` (score and weight) when its score is lower
+  than `compare_to`'s.
+- replace_if_higher: grade `component` with `compare_to`'s score when that is
+  higher.
+A rule only fires once every component in `requires` has been received.
+Optional rules (the default) only apply when the student opts in.
+
+A file in schemes/ that does not compile, or reuses another file's scheme id,
+is skipped with a warning and listed by scheme_errors(), so one broken course
+does not stop the others from loading.
+"""
+
+import json
+import warnings
+from collections import namedtuple
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+
+SCHEME_DIR = Path(__file__).parent / 'schemes'
+DEFAULT_SCHEME_ID = 'default'
+
+RULE_KINDS = ('drop_if_lower', 'replace_if_higher')
+
+Component = namedtuple('Component', 'key name weight default_score received checkbox_label input_label exam')
+
+# component/compare_to/requires are indexes into the scheme's component list
+Rule = namedtuple('Rule', 'kind component compare_to requires optional label')
+
+Cutoff = namedtuple('Cutoff', 'grade min note')
+
+
+@dataclass(frozen=True, eq=False)
+class Scheme:
+    id: str
+    name: str
+    description: str
+    components: tuple
+    keys: tuple
+    weights: tuple
+    total_weight: float
+    index: dict
+    rules: tuple
+    cutoffs: tuple
+    cutoff_note: str
+
+    def weight(self, key):
+        return self.weights[self.index[key]]
+
+    @property
+    def optional_rules(self):
+        return tuple(rule for rule in self.rules if rule.optional)
+
+
+def compile_scheme(data):
+    """Validate a parsed scheme document and compile it. Raises ValueError on bad input."""
+    try:
+        return _compile(data)
+    except KeyError as e:
+        raise ValueError(f"Scheme {_name_of(data)} is missing required field {e}") from None
+    except (TypeError, AttributeError) as e:
+        # A field of the wrong shape, such as a list where an object belongs
+        raise ValueError(f"Scheme {_name_of(data)} is malformed: {e}") from None
+
+
+def _name_of(data):
+    return repr(data['id']) if isinstance(data, dict) and 'id' in data else "(no id)"
+
+
+def _compile(data):
+    scheme_id = str(data['id'])
+    raw_components = data['components']
+    if not raw_components:
+        raise ValueError(f"Scheme {scheme_id!r} has no components")
+
+    components = []
+    for raw in raw_components:
+        key = raw['key']
+        name = raw.get('name', key)
+        weight = float(raw['weight'])
+        if weight < 0:
+            raise ValueError(f"Scheme {scheme_id!r}: component {key!r} has a negative weight")
+        components.append(Component(
+            key=key,
+            name=name,
+            weight=weight,
+            default_score=float(raw.get('default_score', 0.0)),
+            received=bool(raw.get('received', False)),
+            checkbox_label=raw.get('checkbox_label', f"I have my {name} grade"),
+            input_label=raw.get('input_label', f"{name} score (percentage)"),
+            exam=bool(raw.get('exam', False)),
+        ))
+
+    keys = tuple(c.key for c in components)
+    if len(set(keys)) != len(keys):
+        raise ValueError(f"Scheme {scheme_id!r} has duplicate component keys")
+    index = {key: i for i, key in enumerate(keys)}
+
+    def position(key, field):
+        if key not in index:
+            raise ValueError(f"Scheme {scheme_id!r}: rule {field} {key!r} is not a component")
+        return index[key]
+
+    rules = []
+    for raw in data.get('rules', ()):
+        kind = raw.get('kind')
+        if kind not in RULE_KINDS:
+            raise ValueError(f"Scheme {scheme_id!r}: unknown rule kind {kind!r}")
+        component = position(raw['component'], 'component')
+        compare_to = position(raw['compare_to'], 'compare_to')
+        requires = tuple(position(key, 'requirement') for key in raw.get('requires', ()))
+        # The rule reads both scores, so both must have been received
+        requires = tuple(dict.fromkeys(requires + (component, compare_to)))
+        rules.append(Rule(kind, component, compare_to, requires, bool(raw.get('optional', True)),
+                          raw.get('label', f"Apply {kind} rule to {components[component].name}?")))
+
+    cutoffs = tuple(sorted(
+        (Cutoff(c['grade'], float(c['min']), c.get('note', '')) for c in data.get('cutoffs', ())),
+        key=lambda c: -c.min,
+    ))
+
+    # Summed in component order, the same way the grading loop sums weights
+    total_weight = 0
+    for component in components:
+        total_weight += component.weight
+
+    return Scheme(
+        id=scheme_id,
+        name=data.get('name', scheme_id),
+        description=data.get('description', ''),
+        components=tuple(components),
+        keys=keys,
+        weights=tuple(c.weight for c in components),
+        total_weight=total_weight,
+        index=index,
+        rules=tuple(rules),
+        cutoffs=cutoffs,
+        cutoff_note=data.get('cutoff_note', ''),
+    )
+
+
+def parse_scheme_file(path):
+    """Read a JSON or YAML scheme file into plain Python data."""
+    path = Path(path)
+    text = path.read_text(encoding='utf-8')
+    if path.suffix in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError(f"Reading {path.name} requires PyYAML (pip install pyyaml)") from None
+        try:
+            return yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise ValueError(f"{path.name} is not valid YAML: {e}") from None
+    return json.loads(text)
+
+
+@lru_cache(maxsize=None)
+def _load(resolved_path):
+    return compile_scheme(parse_scheme_file(resolved_path))
+
+
+def load_scheme(path):
+    """Compiled scheme for a file, parsed only the first time it is asked for in this process."""
+    return _load(str(Path(path).resolve()))
+
+
+@lru_cache(maxsize=None)
+def _available(directory):
+    schemes, errors, files = {}, {}, {}
+    for path in sorted(Path(directory).glob('*')):
+        if path.suffix not in ('.json', '.yaml', '.yml'):
+            continue
+        try:
+            scheme = load_scheme(path)
+            if scheme.id in schemes:
+                raise ValueError(f"scheme id {scheme.id!r} is already used by {files[scheme.id]}")
+        except ValueError as e:
+            # One broken course file must not take down every other course
+            errors[path.name] = str(e)
+            warnings.warn(f"Skipping scheme file {path.name}: {e}", stacklevel=3)
+            continue
+        schemes[scheme.id] = scheme
+        files[scheme.id] = path.name
+    return schemes, errors
+
+
+def available_schemes(directory=SCHEME_DIR):
+    """Every scheme in directory that compiles, keyed by scheme id."""
+    return _available(str(Path(directory).resolve()))[0]
+
+
+def scheme_errors(directory=SCHEME_DIR):
+    """Scheme files in directory that were skipped, with the reason, keyed by file name."""
+    return _available(str(Path(directory).resolve()))[1]
+
+
+def get_scheme(scheme_id_or_path=None):
+    """Look up a scheme by id in SCHEME_DIR, or load it from a file path. None means the default scheme."""
+    if scheme_id_or_path is None:
+        scheme_id_or_path = DEFAULT_SCHEME_ID
+    schemes = available_schemes()
+    if scheme_id_or_path in schemes:
+        return schemes[scheme_id_or_path]
+    if Path(scheme_id_or_path).is_file():
+        return load_scheme(scheme_id_or_path)
+    skipped = scheme_errors()
+    if skipped:
+        raise ValueError(f"Unknown grading scheme {scheme_id_or_path!r} "
+                         f"(skipped scheme files: {'; '.join(f'{name}: {error}' for name, error in skipped.items())})")
+    raise ValueError(f"Unknown grading scheme {scheme_id_or_path!r}")
+
+
+DEFAULT_SCHEME = get_scheme()
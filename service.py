@@ -0,0 +1,431 @@
+"""
+Grade-query HTTP/JSON service for LMS integrations.
+
+    python service.py serve --port 8321
+    python service.py load --spawn --requests 20000 --concurrency 64
+
+Runs the same engine as the page on asyncio's own streams, without extra
+dependencies. Endpoints:
+
+    POST /grade        one student: {"components": {"homework": 92, "mid1": 70, "final": null},
+                       "target": 80, "curve": 2, "drop_mid1": true, "scheme": "default"}
+                       A missing or null component has not been received yet.
+    POST /grade/batch  {"students": [{"student_id": "s1", "components": {...}}, ...]} with
+                       target/curve/drop_mid1/scheme applying to every student unless a
+                       student overrides them
+    GET  /health       liveness
+    GET  /stats        request, coalescing and prediction cache counters
+
+Identical queries that are in flight at the same time share one computation,
+and answers come from the prediction cache (prediction.py) when the state has
+been seen before. Backpressure: connections beyond max_connections and requests
+beyond max_in_flight get 503 with Retry-After, bodies over max_body bytes and
+batches over max_batch students get 413, and idle connections are closed.
+
+The load generator opens keep-alive connections to a running service, replays a
+mix of repeated and distinct queries and reports throughput and p50/p95/p99
+latency.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import subprocess
+import sys
+import time
+import traceback
+from collections import Counter
+
+from grading import accumulate
+from prediction import cache_stats, cached_predict, normalize, rule_messages
+from schemes import DEFAULT_SCHEME_ID, available_schemes
+
+DEFAULT_PORT = 8321
+MAX_CONNECTIONS = 1024
+MAX_IN_FLIGHT = 512
+MAX_BODY = 1 << 20
+MAX_BATCH = 10_000
+IDLE_TIMEOUT = 30.0
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 408: 'Request Timeout',
+           413: 'Payload Too Large', 431: 'Request Header Fields Too Large', 500: 'Internal Server Error',
+           503: 'Service Unavailable'}
+
+
+class QueryError(ValueError):
+    """A request the service can't answer; carries the HTTP status."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_query(query, defaults=None):
+    """Validate a JSON query and return its normalized grade state (see prediction.normalize)."""
+    if not isinstance(query, dict):
+        raise QueryError("Each query must be a JSON object")
+    settings = dict(defaults or {}, **query)
+    schemes = available_schemes()
+    scheme_id = settings.get('scheme', DEFAULT_SCHEME_ID)
+    if not isinstance(scheme_id, str):
+        raise QueryError("scheme must be a grading scheme id")
+    if scheme_id not in schemes:
+        raise QueryError(f"Unknown grading scheme {scheme_id!r}")
+    scheme = schemes[scheme_id]
+
+    raw = settings.get('components', {})
+    if not isinstance(raw, dict):
+        raise QueryError("components must be an object mapping component keys to scores")
+    unknown = set(raw) - set(scheme.keys)
+    if unknown:
+        raise QueryError(f"Unknown components for scheme {scheme_id!r}: {', '.join(sorted(unknown))}")
+    components = {}
+    for key in scheme.keys:
+        value = raw.get(key)
+        if value is None:
+            components[key] = (0.0, False)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and 0 <= value <= 100:
+            components[key] = (float(value), True)
+        else:
+            raise QueryError(f"{key} must be a score between 0 and 100 or null")
+
+    try:
+        target_grade = float(settings.get('target', 80.0))
+        curve_points = float(settings.get('curve', 0.0))
+    except (TypeError, ValueError):
+        raise QueryError("target and curve must be numbers") from None
+    # JSON parsing lets NaN and Infinity through, and they can't be sent back
+    if not (math.isfinite(target_grade) and math.isfinite(curve_points)):
+        raise QueryError("target and curve must be finite numbers")
+    drop_midterm1_if_lower = settings.get('drop_mid1', False)
+    if not isinstance(drop_midterm1_if_lower, bool):
+        raise QueryError("drop_mid1 must be true or false")
+    return normalize(components, drop_midterm1_if_lower, target_grade, curve_points, scheme)
+
+
+def answer(key):
+    """The page's results for a normalized grade state, as JSON-ready data."""
+    state, drop_midterm1_if_lower, target_grade, curve_points, scheme = key
+    components = dict(zip(scheme.keys, state))
+    points, total_weight, dropped = accumulate(components, drop_midterm1_if_lower, scheme)
+    prediction = cached_predict(components, drop_midterm1_if_lower, target_grade, curve_points, scheme)
+    return {
+        'current_grade': points / total_weight if total_weight > 0 else 0,
+        'points': points,
+        'completed_weight': total_weight,
+        'dropped': list(dropped),
+        'rule_messages': rule_messages(components, drop_midterm1_if_lower, scheme),
+        'required_average': prediction.required_average,
+        'final_grade': prediction.final_grade,
+        'status': prediction.status,
+        'message': prediction.message,
+    }
+
+
+class Coalescer:
+    """
+    Share one computation between identical keys requested while it is pending.
+    The computation runs on the next loop iteration, so every request parsed
+    in the meantime joins it.
+    """
+
+    def __init__(self, compute):
+        self.compute = compute
+        self.pending = {}
+        self.computed = 0
+        self.coalesced = 0
+
+    async def get(self, key):
+        future = self.pending.get(key)
+        if future is None:
+            future = self.pending[key] = asyncio.get_running_loop().create_future()
+            asyncio.get_running_loop().call_soon(self._run, key, future)
+        else:
+            self.coalesced += 1
+        # One waiter being cancelled must not cancel the others
+        return await asyncio.shield(future)
+
+    def _run(self, key, future):
+        del self.pending[key]
+        self.computed += 1
+        try:
+            future.set_result(self.compute(key))
+        except Exception as e:
+            future.set_exception(e)
+
+
+class GradeService:
+    def __init__(self, max_connections=MAX_CONNECTIONS, max_in_flight=MAX_IN_FLIGHT, max_body=MAX_BODY,
+                 max_batch=MAX_BATCH, idle_timeout=IDLE_TIMEOUT):
+        self.max_connections = max_connections
+        self.max_in_flight = max_in_flight
+        self.max_body = max_body
+        self.max_batch = max_batch
+        self.idle_timeout = idle_timeout
+        self.coalescer = Coalescer(answer)
+        self.connections = 0
+        self.in_flight = 0
+        self.statuses = Counter()
+
+    async def dispatch(self, method, path, body):
+        """Route one request. Returns (status, JSON-ready payload)."""
+        routes = {'/grade': ('POST', self.grade), '/grade/batch': ('POST', self.grade_batch),
+                  '/health': ('GET', self.health), '/stats': ('GET', self.stats)}
+        if path not in routes:
+            return 404, {'error': f"No endpoint {path}"}
+        allowed, handler = routes[path]
+        if method != allowed:
+            return 405, {'error': f"{path} only accepts {allowed}"}
+        if self.in_flight >= self.max_in_flight:
+            return 503, {'error': "Too many requests in flight, retry shortly"}
+
+        self.in_flight += 1
+        try:
+            payload = None
+            if method == 'POST':
+                try:
+                    payload = json.loads(body)
+                except ValueError:
+                    raise QueryError("Request body is not valid JSON") from None
+            return 200, await handler(payload)
+        except QueryError as e:
+            return e.status, {'error': str(e)}
+        except Exception:
+            # A bug must not drop the connection without an answer
+            traceback.print_exc()
+            return 500, {'error': "Internal error"}
+        finally:
+            self.in_flight -= 1
+
+    async def grade(self, payload):
+        return await self.coalescer.get(parse_query(payload))
+
+    async def grade_batch(self, payload):
+        if not isinstance(payload, dict) or not isinstance(payload.get('students'), list):
+            raise QueryError("Expected {\"students\": [...]}")
+        students = payload['students']
+        if len(students) > self.max_batch:
+            raise QueryError(f"Batches are limited to {self.max_batch} students", status=413)
+        defaults = {name: payload[name] for name in ('target', 'curve', 'drop_mid1', 'scheme') if name in payload}
+        keys = []
+        for i, student in enumerate(students):
+            try:
+                keys.append(parse_query(student, defaults))
+            except QueryError as e:
+                raise QueryError(f"Student {i}: {e}") from None
+        results = await asyncio.gather(*(self.coalescer.get(key) for key in keys))
+        return {'results': [dict(result, student_id=student.get('student_id')) for student, result in zip(students, results)]}
+
+    async def health(self, payload):
+        return {'status': 'ok'}
+
+    async def stats(self, payload):
+        return {
+            'responses': dict(self.statuses),
+            'connections': self.connections,
+            'in_flight': self.in_flight,
+            'computed': self.coalescer.computed,
+            'coalesced': self.coalescer.coalesced,
+            'prediction_cache': cache_stats(),
+        }
+
+    async def handle_connection(self, reader, writer):
+        if self.connections >= self.max_connections:
+            await self._respond(writer, 503, {'error': "Too many connections, retry shortly"}, keep_alive=False)
+            writer.close()
+            return
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), self.idle_timeout)
+                except (asyncio.IncompleteReadError, ConnectionError, asyncio.TimeoutError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 431, {'error': "Request headers too large"}, keep_alive=False)
+                    break
+
+                request_line, *header_lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, path, version = request_line.split(' ')
+                except ValueError:
+                    await self._respond(writer, 400, {'error': "Malformed request line"}, keep_alive=False)
+                    break
+                headers = {}
+                for line in header_lines:
+                    if ':' in line:
+                        name, value = line.split(':', 1)
+                        headers[name.strip().lower()] = value.strip()
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+
+                # Plain ASCII digits only: int() would also take signs, spaces and underscores
+                content_length = headers.get('content-length') or '0'
+                if not (content_length.isascii() and content_length.isdigit()):
+                    await self._respond(writer, 400, {'error': "Invalid Content-Length"}, keep_alive=False)
+                    break
+                length = int(content_length)
+                if length > self.max_body:
+                    await self._respond(writer, 413, {'error': f"Request bodies are limited to {self.max_body} bytes"},
+                                        keep_alive=False)
+                    break
+                try:
+                    body = await asyncio.wait_for(reader.readexactly(length), self.idle_timeout) if length else b''
+                except (asyncio.IncompleteReadError, ConnectionError, asyncio.TimeoutError):
+                    break
+
+                status, payload = await self.dispatch(method, path.split('?', 1)[0], body)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep_alive=True):
+        self.statuses[status] += 1
+        body = json.dumps(payload).encode('utf-8')
+        head = [f"HTTP/1.1 {status} {REASONS[status]}", "Content-Type: application/json",
+                f"Content-Length: {len(body)}", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if status == 503:
+            head.append("Retry-After: 1")
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+
+async def start_service(host='127.0.0.1', port=DEFAULT_PORT, **limits):
+    """Start listening and return the (server, service) pair."""
+    service = GradeService(**limits)
+    server = await asyncio.start_server(service.handle_connection, host, port, limit=16 * 1024)
+    return server, service
+
+
+async def serve(host, port, **limits):
+    server, _ = await start_service(host, port, **limits)
+    print(f"Serving grade queries on http://{host}:{port}", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+def sample_queries(count, distinct=500, seed=0):
+    """count /grade request bodies drawn from `distinct` different students, so some repeat."""
+    rng = random.Random(seed)
+    keys = available_schemes()[DEFAULT_SCHEME_ID].keys
+    students = [
+        {key: round(rng.uniform(40, 100), 1) if rng.random() < 0.7 else None for key in keys}
+        for _ in range(distinct)
+    ]
+    return [
+        json.dumps({'components': rng.choice(students), 'target': rng.choice((50, 70, 80, 90)),
+                    'curve': rng.choice((0, 2.5, 5)), 'drop_mid1': rng.random() < 0.5}).encode('utf-8')
+        for _ in range(count)
+    ]
+
+
+async def load_test(host, port, bodies, concurrency=64, path='/grade'):
+    """Replay bodies over `concurrency` keep-alive connections. Returns a report dictionary."""
+    latencies = []
+    statuses = Counter()
+    queue = iter(bodies)
+
+    async def client():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for body in queue:
+                request = (f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                           f"Content-Length: {len(body)}\r\n\r\n").encode('latin-1') + body
+                start = time.perf_counter()
+                writer.write(request)
+                head = await reader.readuntil(b'\r\n\r\n')
+                length = next(int(line.split(b':')[1]) for line in head.split(b'\r\n')
+                              if line.lower().startswith(b'content-length'))
+                await reader.readexactly(length)
+                latencies.append(time.perf_counter() - start)
+                statuses[int(head.split(b' ', 2)[1])] += 1
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000 if latencies else 0.0
+
+    return {
+        'requests': len(latencies),
+        'seconds': elapsed,
+        'requests_per_second': len(latencies) / elapsed if elapsed > 0 else 0.0,
+        'p50_ms': percentile(50),
+        'p95_ms': percentile(95),
+        'p99_ms': percentile(99),
+        'statuses': dict(statuses),
+    }
+
+
+async def wait_for_port(host, port, timeout=10.0):
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+        else:
+            writer.close()
+            return
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grade-query HTTP/JSON service and its load generator.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = commands.add_parser('serve', help="run the service")
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument('--max-connections', type=int, default=MAX_CONNECTIONS)
+    serve_parser.add_argument('--max-in-flight', type=int, default=MAX_IN_FLIGHT)
+    serve_parser.add_argument('--max-batch', type=int, default=MAX_BATCH)
+
+    load_parser = commands.add_parser('load', help="load test a running service on localhost")
+    load_parser.add_argument('--host', default='127.0.0.1')
+    load_parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    load_parser.add_argument('--requests', type=int, default=20_000)
+    load_parser.add_argument('--concurrency', type=int, default=64)
+    load_parser.add_argument('--distinct', type=int, default=500, help="number of different students in the mix")
+    load_parser.add_argument('--spawn', action='store_true', help="start a service in a subprocess for the test")
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        try:
+            asyncio.run(serve(args.host, args.port, max_connections=args.max_connections,
+                              max_in_flight=args.max_in_flight, max_batch=args.max_batch))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    server = None
+    if args.spawn:
+        server = subprocess.Popen([sys.executable, __file__, 'serve', '--host', args.host, '--port', str(args.port)])
+        asyncio.run(wait_for_port(args.host, args.port))
+    try:
+        report = asyncio.run(load_test(args.host, args.port, sample_queries(args.requests, args.distinct),
+                                       args.concurrency))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+    print(f"{report['requests']} requests in {report['seconds']:.2f}s: {report['requests_per_second']:,.0f} req/s, "
+          f"p50 {report['p50_ms']:.2f} ms, p95 {report['p95_ms']:.2f} ms, p99 {report['p99_ms']:.2f} ms, "
+          f"statuses {report['statuses']}")
+
+
+if __name__ == "__main__":
+    main()
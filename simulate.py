@@ -0,0 +1,165 @@
+"""
+Monte Carlo probability of reaching each grade cutoff.
+
+Every remaining component is sampled from a normal distribution clipped to
+[0, 100]. By default the distribution is fitted to the student's own exam
+scores (the components marked "exam" in the scheme). Section history, given as
+{component: (mean, sd)}, takes precedence for the components it covers. Samples
+are graded in one vectorized batch with the scheme's rules and the curve
+applied, using the page's final grade formula: (points + curve) / weight.
+
+    python simulate.py roster.csv -o risk.csv --samples 100000 --section-history
+
+writes each student's probability of reaching each cutoff for a whole section.
+"""
+
+import argparse
+import csv
+import sys
+import time
+from math import sqrt
+
+import numpy as np
+
+from gradebook import ID_FIELD, detect_format, parse_components, read_records
+from schemes import DEFAULT_SCHEME, get_scheme
+from vectorized import accumulate_matrix
+
+DEFAULT_SAMPLES = 100_000
+
+# Used when a student has no scores to fit from
+PRIOR = (75.0, 15.0)
+
+# Spread never assumed tighter than this, so two equal exam scores don't mean certainty
+MIN_SD = 10.0
+
+
+def fit_distributions(components, history=None, scheme=None):
+    """(mean, sd) for every remaining component."""
+    scheme = scheme or DEFAULT_SCHEME
+    history = history or {}
+    received = [c for c in scheme.components if components[c.key][1]]
+    basis = [components[c.key][0] for c in received if c.exam] or [components[c.key][0] for c in received]
+
+    if len(basis) >= 2:
+        mean = sum(basis) / len(basis)
+        sd = max(sqrt(sum((s - mean) ** 2 for s in basis) / (len(basis) - 1)), MIN_SD)
+    elif basis:
+        mean, sd = basis[0], PRIOR[1]
+    else:
+        mean, sd = PRIOR
+
+    return {
+        c.key: tuple(history.get(c.key, (mean, sd)))
+        for c in scheme.components if not components[c.key][1]
+    }
+
+
+def sample_outcomes(components, samples=DEFAULT_SAMPLES, curve_points=0, drop_midterm1_if_lower=False,
+                    history=None, scheme=None, seed=0):
+    """Final grade of each of `samples` simulated completions of the course."""
+    scheme = scheme or DEFAULT_SCHEME
+    rng = np.random.default_rng(seed)
+    distributions = fit_distributions(components, history, scheme)
+
+    scores = np.empty((samples, len(scheme.keys)))
+    for j, key in enumerate(scheme.keys):
+        if key in distributions:
+            mean, sd = distributions[key]
+            scores[:, j] = np.clip(rng.normal(mean, sd, samples), 0.0, 100.0)
+        else:
+            scores[:, j] = components[key][0]
+    has_grade = np.ones(scores.shape, dtype=bool)
+
+    points, total_weight, _ = accumulate_matrix(scores, has_grade, drop_midterm1_if_lower, scheme)
+    return np.divide(points + curve_points, total_weight, out=np.zeros(samples), where=total_weight > 0)
+
+
+def cutoff_probabilities(components, samples=DEFAULT_SAMPLES, curve_points=0, drop_midterm1_if_lower=False,
+                         history=None, scheme=None, seed=0):
+    """Probability of finishing at or above each cutoff, keyed by grade, plus the expected grade."""
+    scheme = scheme or DEFAULT_SCHEME
+    outcomes = sample_outcomes(components, samples, curve_points, drop_midterm1_if_lower, history, scheme, seed)
+    probabilities = {c.grade: float(np.count_nonzero(outcomes >= c.min)) / samples for c in scheme.cutoffs}
+    return probabilities, float(outcomes.mean())
+
+
+def section_history(records, scheme=None):
+    """(mean, sd) of every component over the students who have received it."""
+    scheme = scheme or DEFAULT_SCHEME
+    count = dict.fromkeys(scheme.keys, 0)
+    total = dict.fromkeys(scheme.keys, 0.0)
+    squares = dict.fromkeys(scheme.keys, 0.0)
+    for row, record in enumerate(records, 1):
+        _, components = parse_components(record, scheme, row)
+        for key, (score, has_grade) in components.items():
+            if has_grade:
+                count[key] += 1
+                total[key] += score
+                squares[key] += score * score
+
+    history = {}
+    for key in scheme.keys:
+        if count[key] >= 2:
+            mean = total[key] / count[key]
+            variance = max(squares[key] - count[key] * mean * mean, 0.0) / (count[key] - 1)
+            history[key] = (mean, max(sqrt(variance), MIN_SD))
+    return history
+
+
+def section_risk(records, samples=DEFAULT_SAMPLES, curve_points=0, drop_midterm1_if_lower=False,
+                 history=None, scheme=None, seed=0):
+    """Yield one result dictionary per student with the probability of reaching each cutoff."""
+    scheme = scheme or DEFAULT_SCHEME
+    for row, record in enumerate(records, 1):
+        student_id, components = parse_components(record, scheme, row)
+        probabilities, expected = cutoff_probabilities(components, samples, curve_points, drop_midterm1_if_lower,
+                                                       history, scheme, seed)
+        yield {ID_FIELD: student_id, 'expected_grade': expected,
+               **{f"P({grade})": p for grade, p in probabilities.items()}}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Probability of reaching each grade cutoff for every student in a gradebook export.")
+    parser.add_argument('input', help="gradebook export (CSV or JSONL, see gradebook.py)")
+    parser.add_argument('-o', '--output', default='-', help="CSV results file, or - for stdout (default)")
+    parser.add_argument('--input-format', choices=('csv', 'jsonl'), help="defaults to the input file extension")
+    parser.add_argument('--samples', type=int, default=DEFAULT_SAMPLES, help="simulated completions per student")
+    parser.add_argument('--curve', type=float, default=0.0, help="potential curve adjustment (points)")
+    parser.add_argument('--drop-mid1', action='store_true', help="apply the scheme's optional drop rules")
+    parser.add_argument('--scheme', help="grading scheme id or scheme file (default: the syllabus course)")
+    parser.add_argument('--section-history', action='store_true',
+                        help="fit remaining components to the section's scores instead of each student's own")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    scheme = get_scheme(args.scheme)
+    input_format = args.input_format or detect_format(args.input)
+
+    history = None
+    if args.section_history:
+        with open(args.input, newline='', encoding='utf-8') as source:
+            history = section_history(read_records(source, input_format), scheme)
+
+    fields = [ID_FIELD, 'expected_grade'] + [f"P({c.grade})" for c in scheme.cutoffs]
+    sink = sys.stdout if args.output == '-' else open(args.output, 'w', newline='', encoding='utf-8')
+    start = time.perf_counter()
+    count = 0
+    try:
+        with open(args.input, newline='', encoding='utf-8') as source:
+            writer = csv.DictWriter(sink, fieldnames=fields)
+            writer.writeheader()
+            for result in section_risk(read_records(source, input_format), args.samples, args.curve,
+                                       args.drop_mid1, history, scheme, args.seed):
+                writer.writerow(result)
+                count += 1
+    finally:
+        if sink is not sys.stdout:
+            sink.close()
+    elapsed = time.perf_counter() - start
+
+    print(f"Simulated {count} students x {args.samples} samples in {elapsed:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import io
+
+import numpy as np
+import pytest
+
+from analytics import SectionIndex, parse_sweep
+from gradebook import read_records
+from grading import CUTOFFS
+from samples import random_roster
+from vectorized import accumulate_matrix
+
+
+def letter(percentage):
+    return next((grade for grade, minimum in CUTOFFS.items() if percentage >= minimum), 'F')
+
+
+def test_sensitivity_matches_per_student_grading():
+    scores, has_grade = random_roster(3000, seed=5)
+    has_grade[:2000] = True
+    points, total_weight, _ = accumulate_matrix(scores, has_grade, True)
+    index = SectionIndex(points, total_weight)
+    graded = total_weight > 0
+    percentages = points[graded] / total_weight[graded]
+
+    rows = index.sensitivity([0.0, 1.5, 4.0, 12.0], shifts=[0.0, 3.0])
+    for row in rows:
+        moved = percentages + row['curve'] / total_weight[graded] + row['shift']
+        before, after = [letter(p) for p in percentages], [letter(p) for p in moved]
+        assert {grade: row[grade] for grade in index.grades} == {grade: after.count(grade) for grade in index.grades}
+        assert row['changed'] == sum(a != b for a, b in zip(before, after))
+        assert index.grade_counts(row['curve'], row['shift']) == {grade: row[grade] for grade in index.grades}
+
+
+def test_crossings():
+    export = io.StringIO("student_id,homework,discussion,mid1,mid2,mid3,final\n"
+                         "a,79,79,79,79,79,79\n"
+                         "b,69,69,69,69,69,69\n"
+                         "c,90,90,90,90,90,90\n"
+                         "d,,,,,,\n")
+    index = SectionIndex.from_records(read_records(export, 'csv'))
+    assert (index.size, index.ungraded) == (3, 1)
+    assert index.crossings(0.5) == {'A-': 0, 'B-': 0, 'C-': 0, 'D-': 0}
+    assert index.crossings(1.0) == {'A-': 1, 'B-': 1, 'C-': 0, 'D-': 0}
+    assert index.crossings(0.0, cutoff_shift=1.0) == {'A-': 1, 'B-': 1, 'C-': 0, 'D-': 0}
+    assert index.count_at_least(80, 1.0) == 2
+
+
+def test_parse_sweep():
+    assert parse_sweep('0:1:0.25') == [0.0, 0.25, 0.5, 0.75, 1.0]
+    assert parse_sweep('0,2.5') == [0.0, 2.5]
+    assert np.allclose(parse_sweep('0:10:0.1')[-1], 10.0)
+    for text in ('0:10:0', '10:0:-1'):
+        with pytest.raises(ValueError, match="step must be positive"):
+            parse_sweep(text)
+    # The length is checked before np.arange allocates anything
+    assert len(parse_sweep('0:99:1', limit=100)) == 100
+    for text in ('0:100:1', '0:1e12:1', ','.join('0' * 101)):
+        with pytest.raises(ValueError, match="at most 100"):
+            parse_sweep(text, limit=100)
+    for text in ('0:5', '0:nan:1', 'nan, 80', '80,inf', '50,x'):
+        with pytest.raises(ValueError):
+            parse_sweep(text)
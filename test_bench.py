@@ -0,0 +1,35 @@
+import bench
+from bench import compare, metric
+
+BASELINE = {
+    'calculate_grade_latency': metric(4.0, 'us'),
+    'roster_1000_throughput': metric(1e6, 'students/s', higher_is_better=True),
+}
+
+
+def test_compare_flags_slower_metrics_only():
+    same = {'calculate_grade_latency': metric(4.5, 'us'), 'roster_1000_throughput': metric(0.9e6, 'students/s', True)}
+    assert compare(same, BASELINE) == []
+
+    slower = {'calculate_grade_latency': metric(6.0, 'us'), 'roster_1000_throughput': metric(0.5e6, 'students/s', True)}
+    assert [name for name, _ in compare(slower, BASELINE)] == ['calculate_grade_latency', 'roster_1000_throughput']
+
+    # Faster is never a regression, and metrics missing from either side are skipped
+    faster = {'calculate_grade_latency': metric(1.0, 'us'), 'app_rerun': metric(10.0, 'ms')}
+    assert compare(faster, BASELINE) == []
+
+
+def test_noisy_metrics_get_their_own_tolerance():
+    baseline = {'app_rerun': metric(30.0, 'ms')}
+    assert compare({'app_rerun': metric(42.0, 'ms', tolerance=0.5)}, baseline) == []
+    assert [name for name, _ in compare({'app_rerun': metric(42.0, 'ms')}, baseline)] == ['app_rerun']
+    # A wider suite tolerance still applies
+    assert compare({'app_rerun': metric(50.0, 'ms', tolerance=0.5)}, baseline, tolerance=1.0) == []
+
+
+def test_a_missing_baseline_fails(tmp_path, monkeypatch):
+    monkeypatch.setattr(bench, 'run_suite', lambda sizes: {'metrics': {'app_rerun': metric(30.0, 'ms')}})
+    arguments = ['--quick', '-o', str(tmp_path / 'results.json'), '--baseline', str(tmp_path / 'baseline.json')]
+    assert bench.main(arguments) == 2
+    assert bench.main(arguments + ['--save-baseline']) == 0
+    assert bench.main(arguments) == 0
@@ -1,55 +1,4 @@
-def calculate_grade(components, drop_midterm1_if_lower=False):
-    """
-    Calculate the grade based on received components.
-    components is a dictionary with keys: homework, discussion, mid1, mid2, mid3, final
-    Each value is a tuple of (score, has_grade)
-    If drop_midterm1_if_lower is True, it drops Midterm 1 if all midterms are present
-    and Midterm 1 score < Midterm 2 score.
-    """
-    current_grade = 0
-    total_weight = 0
-    midterm_scores = {}
-    midterm_to_drop = None
-    
-    weights = {
-        'homework': 0.05,
-        'discussion': 0.10,
-        'mid1': 0.20,
-        'mid2': 0.20,
-        'mid3': 0.20,
-        'final': 0.25
-    }
-    
-    # Initial pass to calculate grade and weight, and collect midterm scores
-    for component, (score, has_grade) in components.items():
-        if has_grade:
-            current_grade += score * weights[component]
-            total_weight += weights[component]
-            if component in ['mid1', 'mid2', 'mid3']:
-                midterm_scores[component] = score
-    
-    # Check conditions for dropping Midterm 1
-    all_midterms_entered = all(components[m][1] for m in ['mid1', 'mid2', 'mid3'])
-    
-    if drop_midterm1_if_lower and all_midterms_entered:
-        if midterm_scores['mid1'] < midterm_scores['mid2']:
-            midterm1_score = midterm_scores['mid1']
-            # Adjust grade and weight
-            current_grade -= midterm1_score * weights['mid1']
-            total_weight -= weights['mid1']
-            midterm_to_drop = 'mid1'
-            print("  (Info: Midterm 1 dropped)") # Add info for test output
-        else:
-            print("  (Info: Midterm 1 not dropped - condition not met)") # Add info for test output
-            
-    # Calculate final percentage based on potentially adjusted grade/weight
-    if total_weight > 0:
-        current_percentage = current_grade / total_weight
-    else:
-        current_percentage = 0
-    
-    # Return total points, effective weight, and the calculated percentage average
-    return current_grade, total_weight, current_percentage 
+from grading import calculate_grade, calculate_grades_batch, calculate_required_average
 
 def test_cases():
     # Test Case 1: All perfect scores
@@ -154,49 +103,6 @@ def test_cases():
     print(f"Percentage: {percentage:.2f}% (should be 89.75%)")
     print()
 
-# --- New function to test prediction logic --- 
-def calculate_required_average(components, target_grade, drop_midterm1_if_lower=False, curve_points=0):
-    """Calculates the average score needed on remaining assignments."""
-    # First, calculate current grade and weight using existing logic
-    current_grade = 0
-    total_weight = 0
-    midterm_scores = {}
-    midterm_to_drop = None
-    
-    weights = {
-        'homework': 0.05, 'discussion': 0.10,
-        'mid1': 0.20, 'mid2': 0.20, 'mid3': 0.20, 'final': 0.25
-    }
-    
-    # Initial pass
-    for component, (score, has_grade) in components.items():
-        if has_grade:
-            current_grade += score * weights[component]
-            total_weight += weights[component]
-            if component in ['mid1', 'mid2', 'mid3']:
-                midterm_scores[component] = score
-    
-    # Apply drop logic
-    all_midterms_entered = all(components[m][1] for m in ['mid1', 'mid2', 'mid3'])
-    if drop_midterm1_if_lower and all_midterms_entered:
-        if midterm_scores['mid1'] < midterm_scores['mid2']:
-            current_grade -= midterm_scores['mid1'] * weights['mid1']
-            total_weight -= weights['mid1']
-            midterm_to_drop = 'mid1'
-
-    # Calculate remaining weight and points needed
-    max_possible_weight = 1.0 - (weights['mid1'] if midterm_to_drop else 0.0)
-    remaining_weight = max_possible_weight - total_weight
-
-    if remaining_weight <= 1e-6: # Use small tolerance for floating point comparison near zero
-        return None # Or float('inf') if you prefer for "impossible" or already done
-
-    points_needed = target_grade - current_grade
-    adjusted_points_needed = points_needed - curve_points
-    
-    required_average = adjusted_points_needed / remaining_weight
-    return required_average
-
 # --- Test cases for the prediction logic --- 
 def test_predictions():
     print("--- Testing Prediction Logic ---")
@@ -253,6 +159,21 @@ def test_predictions():
     print(f"  Req Avg: {req_avg_all_in} (should be None, as remaining weight is 0)")
     print()
 
+# --- Test cases for roster grading ---
+def test_batch():
+    rows = [
+        {
+            'homework': (100, True), 'discussion': (100, True),
+            'mid1': (m1, True), 'mid2': (80, True),
+            'mid3': (90, m1 % 2 == 0), 'final': (95, m1 % 3 == 0)
+        }
+        for m1 in range(60, 101)
+    ]
+    for drop in (False, True):
+        batch = calculate_grades_batch(rows, drop_midterm1_if_lower=drop)
+        assert batch == [calculate_grade(row, drop_midterm1_if_lower=drop) for row in rows]
+
 if __name__ == "__main__":
     test_cases() # Run original grade calculation tests
-    test_predictions() # Run new prediction logic tests 
\ No newline at end of file
+    test_predictions() # Run new prediction logic tests
+    test_batch() # Run roster grading tests 
\ No newline at end of file
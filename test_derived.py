@@ -0,0 +1,47 @@
+from derived import PAGE_GRAPH, Graph
+from grading import accumulate
+from prediction import cached_predict
+from samples import PARTIAL
+
+INPUTS = {'components': PARTIAL, 'drop': False, 'target': 90.0, 'curve': 5.0, 'scheme': None}
+
+
+def test_first_run_computes_everything():
+    evaluation = PAGE_GRAPH.evaluate(INPUTS, {})
+    assert evaluation.recomputed == list(PAGE_GRAPH.nodes)
+    assert evaluation.values['accumulated'] == accumulate(PARTIAL)
+    points, weight, _ = accumulate(PARTIAL)
+    assert evaluation.values['current_average'] == points / weight
+    assert evaluation.values['prediction'] == cached_predict(PARTIAL, False, 90.0, 5.0)
+
+
+def test_only_downstream_nodes_rerun():
+    store = {}
+    PAGE_GRAPH.evaluate(INPUTS, store)
+    assert PAGE_GRAPH.evaluate(INPUTS, store).recomputed == []
+    assert PAGE_GRAPH.evaluate(dict(INPUTS, target=80.0), store).recomputed == ['prediction']
+
+    evaluation = PAGE_GRAPH.evaluate(dict(INPUTS, target=80.0, components=dict(PARTIAL, mid2=(90, True))), store)
+    assert evaluation.recomputed == list(PAGE_GRAPH.nodes)
+    assert evaluation.values['accumulated'] == accumulate(dict(PARTIAL, mid2=(90, True)))
+
+
+def test_unchanged_value_stops_propagation():
+    calls = []
+    graph = Graph()
+
+    @graph.node('x')
+    def sign(x):
+        return x >= 0
+
+    @graph.node('sign')
+    def label(sign):
+        calls.append(sign)
+        return "positive" if sign else "negative"
+
+    store = {}
+    graph.evaluate({'x': 1}, store)
+    evaluation = graph.evaluate({'x': 2}, store)
+    assert evaluation.recomputed == ['sign']
+    assert evaluation.values['label'] == "positive"
+    assert calls == [True]
@@ -0,0 +1,95 @@
+import random
+
+import pytest
+
+from frontier import final_outcome, frontier, frontier_rows, minimum_needed
+
+STATE = {
+    'homework': (100, True), 'discussion': (100, True), 'mid1': (70, True),
+    'mid2': (0, False), 'mid3': (0, False), 'final': (0, False)
+}
+
+
+def test_minimum_needed():
+    # No drop: 57 points in, the final carries 25%
+    assert minimum_needed(STATE, 80, 'final', {'mid2': 80, 'mid3': 60}) == pytest.approx(92)
+    # Midterm 1 (70 < 80) dropped: (43 + 0.25 f) / 0.8 >= 80
+    assert minimum_needed(STATE, 80, 'final', {'mid2': 80, 'mid3': 60}, 0, True) == pytest.approx(84)
+    assert minimum_needed(STATE, 50, 'final', {'mid2': 80, 'mid3': 60}) == 0
+    assert minimum_needed(STATE, 99, 'final', {'mid2': 80, 'mid3': 60}) is None
+    with pytest.raises(ValueError):
+        minimum_needed(STATE, 80, 'final', {'mid2': 80})
+
+
+def brute_force(state, target, pivot, assumed, curve, drop):
+    # Smallest score on a fine grid that reaches the target
+    filled = dict(state, **{key: (score, True) for key, score in assumed.items()})
+    for step in range(2001):
+        filled[pivot] = (step / 20, True)
+        if final_outcome(filled, drop, curve) >= target - 1e-9:
+            return step / 20
+    return None
+
+
+def test_minimum_needed_matches_search():
+    rng = random.Random(3)
+    for _ in range(100):
+        pivot = rng.choice(['mid2', 'final'])
+        assumed = {key: round(rng.uniform(0, 100), 2) for key in ('mid2', 'mid3', 'final') if key != pivot}
+        target, curve, drop = rng.choice([40, 50, 70, 80]), rng.choice([0, 2.5]), rng.random() < 0.7
+        exact = minimum_needed(STATE, target, pivot, assumed, curve, drop)
+        grid = brute_force(STATE, target, pivot, assumed, curve, drop)
+        if exact is None:
+            assert grid is None
+        else:
+            # The grid answer is the first step at or above the exact minimum
+            assert exact <= grid + 1e-9 and grid - exact < 0.05 + 1e-9
+
+
+def interpolate(points, x):
+    for a, b in zip(points, points[1:]):
+        if a.x < x < b.x:
+            if a.needed is None or b.needed is None:
+                return None
+            return a.needed + (b.needed - a.needed) * (x - a.x) / (b.x - a.x)
+    raise AssertionError
+
+
+@pytest.mark.parametrize('curve', [0, 2])
+def test_frontier_is_exact(curve):
+    rng = random.Random(5)
+    for axis, pivot, assumed in [('mid3', 'final', {'mid2': 80}), ('mid2', 'final', {'mid3': 80}),
+                                 ('final', 'mid2', {'mid3': 80}), ('mid3', 'mid2', {'final': 60})]:
+        points = frontier(STATE, 80, axis, pivot, assumed, curve, True)
+        assert len(points) < 10
+        for _ in range(100):
+            x = rng.uniform(0, 100)
+            if any(abs(x - p.x) < 1e-6 for p in points):
+                continue
+            expected = minimum_needed(STATE, 80, pivot, dict(assumed, **{axis: x}), curve, True)
+            got = interpolate(points, x)
+            assert (got is None) == (expected is None)
+            if expected is not None:
+                assert got == pytest.approx(expected, abs=1e-6)
+
+
+def test_frontier_rows_mark_jumps():
+    rows = frontier_rows(frontier(STATE, 80, 'mid2', 'final', {'mid3': 80}, 0, True), 'Midterm 2', 'Final')
+    assert rows == [
+        {'Midterm 2 score': '0.00%', 'Final needed': 'Not reachable'},
+        {'Midterm 2 score': 'just below 50.00%', 'Final needed': 'Not reachable'},
+        {'Midterm 2 score': '50.00%', 'Final needed': '100.00%'},
+        # Midterm 1 (70) is dropped once Midterm 2 beats it
+        {'Midterm 2 score': '70.00%', 'Final needed': '84.00%'},
+        {'Midterm 2 score': 'just above 70.00%', 'Final needed': '76.00%'},
+        {'Midterm 2 score': '100.00%', 'Final needed': '52.00%'},
+    ]
+
+
+def test_frontier_kinks_where_the_rule_flips_on_the_pivot():
+    # With a curve of 2, Midterm 2 needs 100 at a 44 final and falls to exactly
+    # Midterm 1's 70 at 68, where dropping Midterm 1 keeps it there until 76
+    points = frontier(STATE, 80, 'final', 'mid2', {'mid3': 80}, 2, True)
+    assert [(round(p.x, 6), p.needed if p.needed is None else round(p.needed, 6)) for p in points if p.side == 'at'] == [
+        (0, None), (44, 100), (68, 70), (76, 70), (100, 40)]
+    assert interpolate(points, 60) == pytest.approx(minimum_needed(STATE, 80, 'mid2', {'mid3': 80, 'final': 60}, 2, True))
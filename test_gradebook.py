@@ -0,0 +1,54 @@
+import io
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from gradebook import grade_records, grade_records_parallel, read_records, write_results
+from grading import calculate_grade, calculate_required_average
+from samples import PARTIAL
+
+CSV_EXPORT = """student_id,homework,discussion,mid1,mid2,mid3,final
+s1,100,100,80,80,,
+s2,100,100,70,80,90,95
+s3,,,,,,
+"""
+
+
+def test_csv_pipeline():
+    results = list(grade_records(read_records(io.StringIO(CSV_EXPORT), 'csv'), 90, 5, True))
+    assert [r['student_id'] for r in results] == ['s1', 's2', 's3']
+
+    _, weight, percentage = calculate_grade(PARTIAL, True)
+    assert results[0]['current_grade'] == percentage
+    assert results[0]['completed_weight'] == weight
+    assert results[0]['required_average'] == calculate_required_average(PARTIAL, 90, True, 5)
+    assert results[0]['dropped'] == []
+
+    # Everything in, Midterm 1 dropped: nothing left to predict
+    assert results[1]['dropped'] == ['mid1']
+    assert results[1]['required_average'] is None
+    assert results[2]['completed_weight'] == 0
+
+
+def test_jsonl_roundtrip():
+    lines = "\n".join(json.dumps(r) for r in [
+        {'student_id': 'a', 'homework': 100, 'mid1': 50, 'mid2': None},
+        {'student_id': 'b', 'final': 60},
+    ])
+    out = io.StringIO()
+    count = write_results(grade_records(read_records(io.StringIO(lines), 'jsonl'), 80), out, 'csv')
+    assert count == 2
+    rows = out.getvalue().splitlines()
+    assert rows[0] == 'student_id,current_grade,completed_weight,required_average,dropped'
+    assert rows[2].startswith('b,60.0,0.25,')
+
+
+def test_bad_scores_name_their_row_and_column():
+    export = CSV_EXPORT + "s4,100,n/a,,,,\n"
+    with pytest.raises(ValueError, match=r"Row 4 \(student s4\): discussion is not a number: 'n/a'"):
+        list(grade_records(read_records(io.StringIO(export), 'csv'), 80))
+    with ProcessPoolExecutor(2) as executor:
+        results = grade_records_parallel(read_records(io.StringIO(export), 'csv'), executor, 2, 80, chunk_size=3)
+        with pytest.raises(ValueError, match="Row 4 "):
+            list(results)
@@ -0,0 +1,56 @@
+import io
+
+import numpy as np
+import pytest
+
+from gradebook import grade_records, read_records
+from gradefile import GradeFile, GradeFileWriter, grade_file, pack, unpack
+
+EXPORT = ("student_id,homework,discussion,mid1,mid2,mid3,final\r\n"
+          "a,90.5,80.0,70.0,75.25,,\r\n"
+          "b,,,,,,\r\n"
+          "c,100.0,87.3,60.0,55.0,91.0,88.5\r\n")
+
+
+def test_csv_round_trip(tmp_path):
+    path = tmp_path / 'roster.grades'
+    assert pack(read_records(io.StringIO(EXPORT), 'csv'), path) == 3
+    with GradeFile(path) as gradefile:
+        assert (len(gradefile), gradefile.scheme_id, gradefile.width) == (3, 'default', 6)
+        out = io.StringIO()
+        unpack(gradefile, out)
+    assert out.getvalue() == EXPORT
+
+
+def test_grades_match_the_streaming_grader(tmp_path):
+    rng = np.random.default_rng(2)
+    scores = np.round(rng.uniform(0, 100, (203, 6)) * 4) / 4
+    has_grade = rng.random((203, 6)) < 0.7
+    path = tmp_path / 'roster.grades'
+    with GradeFileWriter(path, chunk_size=10) as writer:
+        # Blocks that don't end on a byte boundary of the has-grade bitmap
+        writer.append_matrix(scores[:13], has_grade[:13], [f"s{i}" for i in range(13)])
+        for i in range(13, 203):
+            writer.append({key: (scores[i, j], has_grade[i, j]) for j, key in enumerate(writer.scheme.keys)}, f"s{i}")
+
+    csv_export = io.StringIO()
+    with GradeFile(path) as gradefile:
+        unpack(gradefile, csv_export)
+        expected = list(grade_records(read_records(io.StringIO(csv_export.getvalue()), 'csv'), 85, 3, True))
+        assert list(grade_file(gradefile, 85, 3, True, chunk_size=50)) == expected
+        assert list(grade_file(gradefile, 85, 3, True, start=101, stop=150)) == expected[101:150]
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'roster.csv'
+    path.write_text(EXPORT)
+    with pytest.raises(ValueError, match="not a gradebook file"):
+        GradeFile(path)
+
+
+def test_failed_pack_leaves_no_file(tmp_path):
+    path = tmp_path / 'roster.grades'
+    export = EXPORT + "s9,100,oops,,,,\n"
+    with pytest.raises(ValueError, match="discussion is not a number"):
+        pack(read_records(io.StringIO(export), 'csv'), path)
+    assert list(tmp_path.iterdir()) == []
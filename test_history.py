@@ -0,0 +1,78 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+from gradebook import read_records
+from history import HistoryStore, encode_state
+from prediction import predict
+from samples import PARTIAL
+
+
+def test_snapshots_only_when_inputs_change(tmp_path):
+    with HistoryStore(tmp_path / 'history.db') as store:
+        first = store.save('s1', PARTIAL, False, 80.0, saved_at=1.0)
+        assert first is not None
+        # Scores of grades not received yet do not count as a change
+        assert store.save('s1', {**PARTIAL, 'final': (55, False)}, False, 80.0) is None
+        second = store.save('s1', PARTIAL, False, 90.0, saved_at=2.0)
+        assert second > first
+
+        latest = store.latest('s1', 'default')
+        assert (latest.id, latest.target, latest.saved_at) == (second, 90.0, 2.0)
+        assert latest.components == {key: (float(score), has_grade) for key, (score, has_grade) in PARTIAL.items()}
+        expected = predict(PARTIAL, False, 90.0)
+        assert (latest.required_average, latest.final_grade, latest.status) == (
+            expected.required_average, expected.final_grade, expected.status)
+
+        assert [snapshot.target for snapshot in store.history('s1', 'default')] == [80.0, 90.0]
+        assert [snapshot.id for snapshot in store.history('s1', 'default', limit=1)] == [second]
+        assert store.latest('s1', 'other-course') is None
+        assert store.latest('s2', 'default') is None
+
+
+def test_encode_state_is_canonical():
+    assert encode_state(PARTIAL, False, 80, 0) == encode_state({**PARTIAL, 'mid3': (70.0, False)}, 0, 80.0, 0.0)
+    assert encode_state(PARTIAL, False, 80, 0) != encode_state(PARTIAL, True, 80, 0)
+
+
+def test_import_and_section_report(tmp_path):
+    export = ("student_id,homework,discussion,mid1,mid2,mid3,final\n"
+              "a,90,80,70,75,,\n"
+              "b,100,90,60,55,91,88\n")
+    with HistoryStore(tmp_path / 'history.db') as store:
+        assert store.import_records(read_records(io.StringIO(export), 'csv'), 80.0, section='A') == (2, 0)
+        assert store.import_records(read_records(io.StringIO(export), 'csv'), 80.0, section='A') == (0, 2)
+        store.save('a', PARTIAL, False, 80.0, section='A')
+        store.save('c', PARTIAL, False, 80.0, section='B')
+
+        latest = store.section_latest('default', 'A')
+        assert [snapshot.student_id for snapshot in latest] == ['a', 'b']
+        assert latest[0].components['mid1'] == (80.0, True)
+        assert latest[1].status in ('final_met', 'final_below')
+        assert [snapshot.student_id for snapshot in store.section_latest('default')] == ['a', 'b', 'c']
+        assert store.count() == 4
+
+
+def test_section_changes_are_saved(tmp_path):
+    with HistoryStore(tmp_path / 'history.db') as store:
+        store.save('s42', PARTIAL, False, 80.0)
+        # Typing a section with the same grades is a change
+        assert store.save('s42', PARTIAL, False, 80.0, section='A') is not None
+        assert [snapshot.student_id for snapshot in store.section_latest('default', 'A')] == ['s42']
+
+        # A student who moves is reported in the new section only
+        store.save('s42', PARTIAL, False, 80.0, section='B')
+        assert store.section_latest('default', 'A') == []
+        assert [snapshot.section for snapshot in store.section_latest('default', 'B')] == ['B']
+        assert store.count() == 3
+
+
+def test_sessions_share_the_store_across_threads(tmp_path):
+    with HistoryStore(tmp_path / 'history.db', pool_size=2) as store:
+        def session(i):
+            return [store.save(f"s{i}", {**PARTIAL, 'mid3': (score, True)}, False, 80.0) for score in (50, 60, 60)]
+
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(session, range(16)))
+        assert all(saved[2] is None and None not in saved[:2] for saved in results)
+        assert store.count() == 32
+        assert store.latest('s7', 'default').components['mid3'] == (60.0, True)
@@ -0,0 +1,19 @@
+import subprocess
+import sys
+
+from page_assets import cutoffs_markdown
+from schemes import DEFAULT_SCHEME
+
+
+def test_cutoffs_markdown_is_built_once():
+    text = cutoffs_markdown(DEFAULT_SCHEME)
+    assert text.splitlines()[0] == "- A-: 80% (roughly fours and fives on exams and full discussion engagement)"
+    assert "- F: Below 40%" in text
+    assert cutoffs_markdown(DEFAULT_SCHEME) is text
+
+
+def test_page_modules_do_not_import_numpy():
+    # NumPy is only loaded when a feature that needs it is used
+    code = "import sys, derived, grading, page_assets, prediction, schemes, timing; print('numpy' in sys.modules)"
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == 'False'
@@ -0,0 +1,30 @@
+import numpy as np
+
+from grading import calculate_grades_batch, required_average_grid
+from parallel import calculate_grades_parallel, chunked, required_average_grids_parallel
+from records import Roster
+from samples import random_roster, to_rows
+
+
+def test_chunked():
+    assert list(chunked(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(chunked([], 3)) == []
+
+
+def test_parallel_matches_serial_order():
+    scores, has_grade = random_roster(5000)
+    rows = to_rows(scores, has_grade)
+    expected = np.array(calculate_grades_batch(rows, True))
+    for roster in ((scores, has_grade), rows, Roster.from_rows(rows)):
+        points, total_weight, percentage = calculate_grades_parallel(roster, True, workers=2, chunk_size=700)
+        assert np.array_equal(np.column_stack([points, total_weight, percentage]), expected)
+
+    targets, curves = (80, 70, 50, 40), (0.0, 5.0)
+    grids = required_average_grids_parallel((scores, has_grade), targets, curves, True, workers=2, chunk_size=700)
+    expected = [required_average_grid(row, targets, curves, True) for row in rows]
+    assert np.array_equal(grids, np.array(expected, dtype=float), equal_nan=True)
+
+
+def test_empty_roster():
+    points, _, _ = calculate_grades_parallel(random_roster(0), workers=2)
+    assert points.shape == (0,)
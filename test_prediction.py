@@ -0,0 +1,31 @@
+from grading import calculate_required_average
+from prediction import cache_stats, cached_predict, clear_cache, normalize, predict
+from samples import PARTIAL
+
+
+def test_predict_statuses():
+    prediction = predict(PARTIAL, False, 90, 5)
+    assert prediction.status == 'needed'
+    assert prediction.required_average == calculate_required_average(PARTIAL, 90, False, 5)
+    assert prediction.remaining[1] == "  - Midterm 3 (20%), Final (25%)"
+    assert predict(PARTIAL, False, 100, 5).status == 'impossible'
+    assert predict(PARTIAL, False, 40, 0).status == 'met'
+
+    complete = dict(PARTIAL, mid1=(70, True), mid3=(90, True), final=(95, True))
+    prediction = predict(complete, True, 90, 0)
+    assert prediction.required_average is None
+    assert prediction.status == 'final_met'
+    assert prediction.metric == "90.94%"
+
+
+def test_cache_normalizes_ungraded_scores():
+    clear_cache()
+    first = cached_predict(PARTIAL, False, 90, 5)
+    # A different score typed into a box that isn't checked is the same state
+    second = cached_predict(dict(PARTIAL, final=(55.0, False)), False, 90, 5)
+    assert first is second
+    assert normalize(PARTIAL, 0, 90, 5) == normalize(dict(PARTIAL, mid3=(12, False)), False, 90.0, 5.0)
+
+    stats = cache_stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (1, 1, 1)
+    assert stats['hit_rate'] == 0.5
@@ -0,0 +1,42 @@
+import io
+
+import numpy as np
+
+from gradebook import load_roster, read_records
+from grading import accumulate, calculate_grade, calculate_grades_batch
+from prediction import predict
+from records import Roster, StudentRecord
+from samples import FINAL_REMAINING, random_roster, to_rows
+from vectorized import to_matrix
+
+
+def test_record_reads_like_the_dictionary():
+    record = StudentRecord.from_components(FINAL_REMAINING, student_id='s1')
+    assert record['mid1'] == (70.0, True)
+    assert record['final'] == (0.0, False)
+    assert record == FINAL_REMAINING
+    assert accumulate(record, True) == accumulate(FINAL_REMAINING, True)
+    assert predict(record, True, 80, 2) == predict(FINAL_REMAINING, True, 80, 2)
+
+
+def test_roster_grades_match_dictionaries():
+    scores, has_grade = random_roster(500, seed=3)
+    rows = to_rows(scores, has_grade)
+    roster = Roster.from_rows(rows, student_ids=range(500))
+    assert len(roster) == 500
+    assert roster[-1].student_id == 499
+    assert calculate_grades_batch(roster, True) == calculate_grades_batch(rows, True)
+    assert [calculate_grade(record, True) for record in roster] == calculate_grades_batch(rows, True)
+
+    matrix_scores, matrix_has = to_matrix(roster)
+    assert np.array_equal(matrix_scores, scores) and np.array_equal(matrix_has, has_grade)
+
+
+def test_load_roster_from_export():
+    export = io.StringIO("student_id,homework,discussion,mid1,mid2,mid3,final\n"
+                         "a,90,80,70,,,\n"
+                         "b,,,,,,\n")
+    roster = load_roster(read_records(export, 'csv'))
+    assert roster.student_ids == ['a', 'b']
+    assert roster[0]['mid2'] == (0.0, False)
+    assert roster.nbytes() == 2 * 6 * 8 + 2
@@ -0,0 +1,33 @@
+import csv
+import io
+
+from prediction import predict
+from samples import PARTIAL, random_roster, to_rows
+from scenarios import grid_csv, scenario_grid, student_grid
+
+TARGETS = [0.0, 40.0, 80.0, 95.0]
+CURVES = [0.0, 2.5, 30.0]
+
+
+def test_grid_matches_the_page_prediction():
+    scores, has_grade = random_roster(200, seed=9)
+    has_grade[:40] = True
+    for drop in (False, True):
+        values, statuses = scenario_grid(scores, has_grade, TARGETS, CURVES, drop)
+        for i, components in enumerate(to_rows(scores, has_grade)):
+            for a, target in enumerate(TARGETS):
+                for b, curve in enumerate(CURVES):
+                    prediction = predict(components, drop, target, curve)
+                    expected = prediction.final_grade if prediction.required_average is None else prediction.required_average
+                    assert (statuses[i, a, b], values[i, a, b]) == (prediction.status, expected)
+
+
+def test_student_csv():
+    values, statuses = student_grid(PARTIAL, [30.0, 90.0], [0.0, 5.0])
+    assert statuses.tolist() == [['met', 'met'], ['needed', 'needed']]
+    lines = io.StringIO(grid_csv(values, statuses, [30.0, 90.0], [0.0, 5.0], 's1')).read().splitlines()
+    assert lines[0] == "student_id,target,curve,required_average,final_grade,status"
+    assert len(lines) == 5 and lines[-1].startswith("s1,90.0,5.0,") and lines[-1].endswith(",,needed")
+    # Ids are quoted like every other export
+    records = list(csv.DictReader(io.StringIO(grid_csv(values, statuses, [30.0], [0.0], 'Doe, J'))))
+    assert records[0]['student_id'] == 'Doe, J'
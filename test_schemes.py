@@ -0,0 +1,109 @@
+import json
+
+import numpy as np
+import pytest
+
+from grading import accumulate, calculate_grade, calculate_required_average
+from schemes import DEFAULT_SCHEME, available_schemes, compile_scheme, get_scheme, load_scheme, scheme_errors
+from vectorized import calculate_grades_vectorized
+
+LAB_COURSE = {
+    'id': 'lab',
+    'components': [
+        {'key': 'labs', 'weight': 0.3},
+        {'key': 'quiz1', 'weight': 0.15},
+        {'key': 'quiz2', 'weight': 0.15},
+        {'key': 'exam', 'weight': 0.4},
+    ],
+    'rules': [
+        {'kind': 'replace_if_higher', 'component': 'quiz1', 'compare_to': 'quiz2'},
+        {'kind': 'drop_if_lower', 'component': 'labs', 'compare_to': 'exam', 'optional': False},
+    ],
+    'cutoffs': [{'grade': 'B', 'min': 70}, {'grade': 'A', 'min': 85}],
+}
+
+
+def test_default_scheme_matches_syllabus():
+    assert DEFAULT_SCHEME.keys == ('homework', 'discussion', 'mid1', 'mid2', 'mid3', 'final')
+    assert DEFAULT_SCHEME.weights == (0.05, 0.10, 0.20, 0.20, 0.20, 0.25)
+    assert DEFAULT_SCHEME.total_weight == 1.0
+    assert [c.grade for c in DEFAULT_SCHEME.cutoffs] == ['A-', 'B-', 'C-', 'D-']
+    assert get_scheme() is get_scheme('default') is DEFAULT_SCHEME
+
+
+def test_rules():
+    scheme = compile_scheme(LAB_COURSE)
+    components = {'labs': (90, True), 'quiz1': (60, True), 'quiz2': (80, True), 'exam': (0, False)}
+    # Quiz 1 replaced by Quiz 2 only when opted in; labs can't be dropped before the exam is in
+    assert accumulate(components, False, scheme) == (90 * 0.3 + 60 * 0.15 + 80 * 0.15, 0.6, ())
+    points, weight, dropped = accumulate(components, True, scheme)
+    assert points == pytest.approx(90 * 0.3 + 80 * 0.15 + 80 * 0.15) and dropped == ()
+    assert calculate_required_average(components, 85, True, 0, scheme) == pytest.approx((85 - points) / 0.4)
+
+    # The labs drop is not optional
+    components['exam'] = (95, True)
+    points, weight, dropped = accumulate(components, False, scheme)
+    assert dropped == ('labs',) and weight == pytest.approx(0.7)
+    assert [c.grade for c in scheme.cutoffs] == ['A', 'B']
+
+
+def test_vectorized_rules_match_scalar():
+    scheme = compile_scheme(LAB_COURSE)
+    rng = np.random.default_rng(1)
+    scores = rng.uniform(0, 100, size=(500, 4)).round(1)
+    has_grade = rng.random((500, 4)) < 0.7
+    for apply in (False, True):
+        points, weight, percentage, _ = calculate_grades_vectorized(scores, has_grade, apply, scheme)
+        for i in range(len(scores)):
+            row = dict(zip(scheme.keys, zip(scores[i].tolist(), has_grade[i].tolist())))
+            assert (points[i], weight[i], percentage[i]) == calculate_grade(row, apply, scheme)
+
+
+def test_load_scheme_is_compiled_once(tmp_path):
+    path = tmp_path / 'lab.json'
+    path.write_text(json.dumps(LAB_COURSE))
+    assert load_scheme(path) is load_scheme(str(path))
+    assert get_scheme(str(path)).keys == ('labs', 'quiz1', 'quiz2', 'exam')
+
+
+def test_yaml_scheme(tmp_path):
+    yaml = pytest.importorskip('yaml')
+    path = tmp_path / 'lab.yaml'
+    path.write_text(yaml.safe_dump(LAB_COURSE))
+    assert load_scheme(path).weights == (0.3, 0.15, 0.15, 0.4)
+
+
+def test_invalid_schemes():
+    with pytest.raises(ValueError):
+        compile_scheme({'id': 'x', 'components': []})
+    with pytest.raises(ValueError):
+        compile_scheme(dict(LAB_COURSE, rules=[{'kind': 'curve', 'component': 'labs', 'compare_to': 'exam'}]))
+    with pytest.raises(ValueError):
+        compile_scheme(dict(LAB_COURSE, rules=[{'kind': 'drop_if_lower', 'component': 'lab', 'compare_to': 'exam'}]))
+    with pytest.raises(ValueError):
+        get_scheme('no-such-course')
+    # Missing or wrongly shaped fields are ValueErrors too
+    with pytest.raises(ValueError, match="'key'"):
+        compile_scheme(dict(LAB_COURSE, components=[{'weight': 0.5}]))
+    with pytest.raises(ValueError, match="'weight'"):
+        compile_scheme(dict(LAB_COURSE, components=[{'key': 'labs'}]))
+    with pytest.raises(ValueError):
+        compile_scheme(dict(LAB_COURSE, components=['labs']))
+    with pytest.raises(ValueError):
+        compile_scheme(dict(LAB_COURSE, rules=[{'kind': 'drop_if_lower', 'component': 'labs'}]))
+    with pytest.raises(ValueError):
+        compile_scheme(dict(LAB_COURSE, cutoffs=[{'grade': 'A'}]))
+
+
+def test_broken_scheme_files_are_skipped(tmp_path):
+    (tmp_path / 'a_lab.json').write_text(json.dumps(LAB_COURSE))
+    (tmp_path / 'bio.json').write_text(json.dumps({'id': 'bio', 'components': [{'weight': 1.0}]}))
+    (tmp_path / 'lab_copy.json').write_text(json.dumps(dict(LAB_COURSE, name="Lab again")))
+    (tmp_path / 'notes.json').write_text("{not json")
+    with pytest.warns(UserWarning) as warned:
+        schemes = available_schemes(tmp_path)
+    assert len(warned) == 3
+    assert list(schemes) == ['lab']
+    errors = scheme_errors(tmp_path)
+    assert sorted(errors) == ['bio.json', 'lab_copy.json', 'notes.json']
+    assert 'a_lab.json' in errors['lab_copy.json']
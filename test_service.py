@@ -0,0 +1,90 @@
+import asyncio
+import json
+
+from grading import calculate_grade, calculate_required_average
+from service import GradeService, load_test, sample_queries, start_service
+
+QUERY = {'components': {'homework': 100, 'discussion': 100, 'mid1': 70, 'mid2': 80, 'mid3': 60, 'final': None},
+         'target': 80, 'curve': 2, 'drop_mid1': True}
+COMPONENTS = {'homework': (100, True), 'discussion': (100, True), 'mid1': (70, True), 'mid2': (80, True),
+              'mid3': (60, True), 'final': (0, False)}
+
+
+def request(service, method, path, payload=None):
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    return asyncio.run(service.dispatch(method, path, body))
+
+
+def test_grade_matches_the_engine():
+    status, result = request(GradeService(), 'POST', '/grade', QUERY)
+    assert status == 200
+    _, total_weight, current = calculate_grade(COMPONENTS, True)
+    assert (result['current_grade'], result['completed_weight']) == (current, total_weight)
+    assert result['required_average'] == calculate_required_average(COMPONENTS, 80, True, 2)
+    assert result['dropped'] == ['mid1'] and result['status'] == 'impossible'
+
+
+def test_batch_coalesces_identical_students():
+    service = GradeService(max_batch=3)
+    status, result = request(service, 'POST', '/grade/batch',
+                             {'target': 90, 'students': [dict(QUERY, student_id=i) for i in range(3)]})
+    assert status == 200
+    assert [r['student_id'] for r in result['results']] == [0, 1, 2]
+    assert (service.coalescer.computed, service.coalescer.coalesced) == (1, 2)
+
+    status, _ = request(service, 'POST', '/grade/batch', {'students': [QUERY] * 4})
+    assert status == 413
+
+
+def test_rejects_bad_queries():
+    service = GradeService()
+    assert request(service, 'POST', '/grade', {'components': {'mid1': 120}})[0] == 400
+    assert request(service, 'POST', '/grade', {'components': {'quiz': 50}})[0] == 400
+    assert request(service, 'POST', '/grade', dict(QUERY, scheme='/etc/passwd'))[0] == 400
+    assert request(service, 'POST', '/grade', dict(QUERY, scheme=[1, 2]))[0] == 400
+    assert request(service, 'POST', '/grade', dict(QUERY, drop_mid1='false'))[0] == 400
+    # Python's json module reads NaN and Infinity, which could not be answered as JSON
+    assert asyncio.run(service.dispatch('POST', '/grade', b'{"target": NaN}'))[0] == 400
+    assert asyncio.run(service.dispatch('POST', '/grade', b'{"curve": -Infinity}'))[0] == 400
+    assert request(service, 'GET', '/grade')[0] == 405
+    assert request(service, 'GET', '/nope')[0] == 404
+
+
+def test_unexpected_errors_still_get_an_answer(monkeypatch):
+    service = GradeService()
+
+    async def broken(payload):
+        raise TypeError("bug")
+
+    monkeypatch.setattr(service, 'health', broken)
+    assert request(service, 'GET', '/health') == (500, {'error': "Internal error"})
+    assert service.in_flight == 0
+
+
+def test_rejects_bad_content_length():
+    async def run(length):
+        server, _ = await start_service('127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(f"POST /grade HTTP/1.1\r\nContent-Length: {length}\r\n\r\n{{}}".encode('latin-1'))
+            status_line = await reader.readline()
+            writer.close()
+        return status_line
+
+    for length in ('abc', '-5', '1_0'):
+        assert asyncio.run(run(length)).startswith(b'HTTP/1.1 400 ')
+
+
+def test_load_over_localhost():
+    async def run():
+        server, service = await start_service('127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            report = await load_test('127.0.0.1', port, sample_queries(300, distinct=20), concurrency=8)
+        return report, service
+
+    report, service = asyncio.run(run())
+    assert report['statuses'] == {200: 300}
+    assert report['p99_ms'] >= report['p50_ms'] > 0
+    assert service.coalescer.computed + service.coalescer.coalesced == 300
@@ -0,0 +1,48 @@
+import io
+from math import erf, sqrt
+
+import pytest
+
+from frontier import minimum_needed
+from gradebook import read_records
+from grading import calculate_grade
+from samples import FINAL_REMAINING
+from simulate import cutoff_probabilities, fit_distributions, section_history, section_risk
+
+
+def test_fit_uses_exam_scores_and_history():
+    assert fit_distributions(FINAL_REMAINING) == {'final': (80.0, 10.0)}
+    assert fit_distributions(FINAL_REMAINING, history={'final': (60.0, 12.0)}) == {'final': (60.0, 12.0)}
+    nothing = {key: (0, False) for key in FINAL_REMAINING}
+    assert fit_distributions(nothing)['final'] == (75.0, 15.0)
+
+
+def test_single_remaining_component_matches_normal_tail():
+    for drop in (False, True):
+        probabilities, _ = cutoff_probabilities(FINAL_REMAINING, 200_000, 2.0, drop, {'final': (65.0, 12.0)})
+        for grade, cutoff in (('A-', 80), ('B-', 70), ('C-', 50)):
+            needed = minimum_needed(FINAL_REMAINING, cutoff, 'final', {}, 2.0, drop)
+            expected = 0.0 if needed is None else 0.5 * (1 - erf((needed - 65.0) / (12.0 * sqrt(2))))
+            if needed == 0:
+                expected = 1.0
+            assert probabilities[grade] == pytest.approx(expected, abs=0.005)
+
+
+def test_complete_record_is_deterministic():
+    complete = dict(FINAL_REMAINING, final=(95, True))
+    probabilities, expected = cutoff_probabilities(complete, 1000)
+    assert expected == pytest.approx(calculate_grade(complete)[2])
+    assert probabilities == {'A-': 1.0, 'B-': 1.0, 'C-': 1.0, 'D-': 1.0}
+
+
+def test_section_risk():
+    export = io.StringIO("student_id,homework,discussion,mid1,mid2,mid3,final\n"
+                         "a,100,100,90,95,,\nb,50,40,35,30,,\nc,80,80,60,70,,\n")
+    records = list(read_records(export, 'csv'))
+    history = section_history(records)
+    assert history['mid1'][0] == pytest.approx(185 / 3)
+    assert 'mid3' not in history
+    risk = {row['student_id']: row for row in section_risk(records, 20_000, history=history)}
+    assert risk['a']['expected_grade'] > risk['c']['expected_grade'] > risk['b']['expected_grade']
+    assert risk['a']['P(A-)'] > 0.5 and risk['b']['P(D-)'] < 0.5
+    assert all(row['P(D-)'] >= row['P(C-)'] >= row['P(B-)'] >= row['P(A-)'] for row in risk.values())
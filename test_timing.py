@@ -0,0 +1,31 @@
+import json
+
+from derived import PAGE_GRAPH
+from samples import PARTIAL
+from timing import NULL_TRACE, Trace, chrome_trace, finish_run, start_run
+
+
+def test_disabled_trace_records_nothing():
+    trace = start_run(enabled=False)
+    assert trace is NULL_TRACE
+    with trace.span("stage"):
+        trace.count("hits")
+    assert trace.span("a") is trace.span("b")
+
+
+def test_spans_nest_and_export():
+    trace = start_run(enabled=True, started=0.0)
+    assert isinstance(trace, Trace)
+    with trace.span("derived values"):
+        PAGE_GRAPH.evaluate({'components': PARTIAL, 'drop': False, 'target': 80.0, 'curve': 0.0, 'scheme': None},
+                            {}, trace=trace)
+    trace.count("recomputed values", 6)
+    finish_run(trace, 0.01)
+
+    rows = trace.rows()
+    assert rows[0]['stage'] == "derived values"
+    assert [row['stage'] for row in rows[1:]] == ["\u2003" + name for name in PAGE_GRAPH.nodes]
+
+    events = json.loads(chrome_trace([trace]))['traceEvents']
+    assert {e['name'] for e in events if e['ph'] == 'X'} == {"derived values", *PAGE_GRAPH.nodes}
+    assert events[-1] == {'name': 'counters', 'ph': 'C', 'ts': 0.01 * 1e6, 'pid': 1, 'args': {"recomputed values": 6}}
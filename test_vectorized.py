@@ -0,0 +1,23 @@
+import numpy as np
+
+from grading import calculate_grade
+from samples import random_roster, to_rows
+from vectorized import calculate_grades_vectorized
+
+
+def test_matches_calculate_grade():
+    scores, has_grade = random_roster(2000)
+    # Make sure the drop rule fires for a good share of students
+    has_grade[::3, 2:5] = True
+    rows = to_rows(scores, has_grade)
+    for drop in (False, True):
+        points, weight, percentage, dropped = calculate_grades_vectorized(scores, has_grade, drop)
+        expected = np.array([calculate_grade(row, drop) for row in rows], dtype=float)
+        # Bit-for-bit, not approximately
+        assert np.array_equal(points, expected[:, 0])
+        assert np.array_equal(weight, expected[:, 1])
+        assert np.array_equal(percentage, expected[:, 2])
+        if drop:
+            assert dropped.any()
+        else:
+            assert not dropped.any()
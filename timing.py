@@ -0,0 +1,166 @@
+"""
+Instrumentation for the Streamlit page: timing spans, counters and run timing.
+
+Every script run gets a Trace from start_run(). The page wraps its stages in
+trace.span(name) and adds counters (prediction cache hits, recomputed values)
+with trace.count(). When timing is off, start_run() returns NULL_TRACE, whose
+span() hands back one shared do-nothing context manager, so the instrumented
+page pays a method call per stage and records nothing.
+
+Turn timing on with GRADE_CALC_TIMING=1, or for one browser session with
+?timing=1 in the page URL. The sidebar then shows a timing panel, the report
+is logged to stderr, and the last TRACE_HISTORY runs can be exported as a
+Chrome trace (chrome://tracing, Perfetto or speedscope) to TRACE_FILE.
+
+The first run in a process includes the cold imports and scheme compilation,
+so it is the time to first render; later runs are reruns.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+# Runs kept for export
+TRACE_HISTORY = 50
+
+TRACE_FILE = os.environ.get('GRADE_CALC_TRACE_FILE', 'grade_calc_trace.json')
+
+_runs = {'count': 0, 'first': None, 'total': 0.0, 'fastest': None}
+_traces = deque(maxlen=TRACE_HISTORY)
+_lock = threading.Lock()
+
+
+def timing_enabled():
+    return os.environ.get('GRADE_CALC_TIMING', '') not in ('', '0')
+
+
+class Trace:
+    """Spans and counters of one script run. Times are time.perf_counter() seconds."""
+
+    enabled = True
+
+    def __init__(self, started=None):
+        self.started = time.perf_counter() if started is None else started
+        self.thread = threading.get_ident()
+        self.spans = []
+        self.counters = {}
+        self.seconds = None
+        self._depth = 0
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            self.spans.append((name, start, time.perf_counter(), self._depth))
+
+    def add_span(self, name, start, end):
+        """Record a span measured elsewhere, such as the imports before the trace existed."""
+        self.spans.append((name, start, end, self._depth))
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def rows(self):
+        """Spans in start order as table rows, indented by nesting depth (em spaces survive table rendering)."""
+        return [
+            {'stage': '\u2003' * depth + name, 'ms': round((end - start) * 1000, 3)}
+            for name, start, end, depth in sorted(self.spans, key=lambda span: (span[1], span[3]))
+        ]
+
+    def chrome_events(self, pid=1):
+        """Complete ('X') events for the spans and one counter ('C') event, in microseconds."""
+        events = [
+            {'name': name, 'ph': 'X', 'ts': start * 1e6, 'dur': (end - start) * 1e6, 'pid': pid, 'tid': self.thread}
+            for name, start, end, _ in self.spans
+        ]
+        if self.counters:
+            end = self.started + (self.seconds or 0.0)
+            events.append({'name': 'counters', 'ph': 'C', 'ts': end * 1e6, 'pid': pid, 'args': dict(self.counters)})
+        return events
+
+
+class _NullTrace:
+    enabled = False
+    _span = nullcontext()
+
+    def span(self, name):
+        return self._span
+
+    def add_span(self, name, start, end):
+        pass
+
+    def count(self, name, value=1):
+        pass
+
+
+NULL_TRACE = _NullTrace()
+
+
+def start_run(enabled=None, started=None):
+    """A Trace for this run, or NULL_TRACE when timing is off."""
+    if enabled is None:
+        enabled = timing_enabled()
+    return Trace(started) if enabled else NULL_TRACE
+
+
+def finish_run(trace, seconds):
+    """Record the run's total time, keep its trace for export and return the report line."""
+    report = record_run(seconds, log=trace.enabled)
+    if trace.enabled:
+        trace.seconds = seconds
+        with _lock:
+            _traces.append(trace)
+    return report
+
+
+def record_run(seconds, log=None):
+    """Add one script run to the process-wide counters and return the report line."""
+    with _lock:
+        _runs['count'] += 1
+        _runs['total'] += seconds
+        if _runs['first'] is None:
+            _runs['first'] = seconds
+        if _runs['fastest'] is None or seconds < _runs['fastest']:
+            _runs['fastest'] = seconds
+        report = run_report(seconds)
+
+    if timing_enabled() if log is None else log:
+        print(f"[timing] {report}", file=sys.stderr)
+    return report
+
+
+def run_report(last):
+    reruns = _runs['count'] - 1
+    mean_rerun = (_runs['total'] - _runs['first']) / reruns if reruns else 0.0
+    return (f"Run {_runs['count']}: {last * 1000:.1f} ms · first render {_runs['first'] * 1000:.1f} ms · "
+            f"mean rerun {mean_rerun * 1000:.1f} ms over {reruns} reruns")
+
+
+def run_stats():
+    """Copy of the counters, in seconds."""
+    return dict(_runs)
+
+
+def chrome_trace(traces=None):
+    """Chrome trace JSON for the kept runs, readable by chrome://tracing, Perfetto and speedscope."""
+    with _lock:
+        traces = list(_traces) if traces is None else traces
+    events = []
+    for trace in traces:
+        events.extend(trace.chrome_events())
+    return json.dumps({'traceEvents': events, 'displayTimeUnit': 'ms'})
+
+
+def write_chrome_trace(path=TRACE_FILE, traces=None):
+    """Write chrome_trace() to path and return the path."""
+    with open(path, 'w', encoding='utf-8') as out:
+        out.write(chrome_trace(traces))
+    return path
@@ -0,0 +1,140 @@
+"""
+NumPy roster grading over a columnar score matrix.
+
+Scores are an (N students x components) float array in scheme component order
+and has_grade is a boolean array of the same shape. Every step applies the same
+floating point operations, in the same order, as grading.accumulate, so the
+results match calculate_grade exactly.
+"""
+
+import numpy as np
+
+from grading import WEIGHT_TOLERANCE
+from records import Roster
+from schemes import DEFAULT_SCHEME
+
+
+def weight_vector(scheme=None):
+    """The scheme's weights as a float array."""
+    return np.array((scheme or DEFAULT_SCHEME).weights)
+
+
+def to_matrix(rows, scheme=None):
+    """
+    Convert component dictionaries into (scores, has_grade) arrays.
+    A Roster's scores are viewed without copying; it cannot grow while the
+    returned scores array is alive.
+    """
+    keys = (scheme or DEFAULT_SCHEME).keys
+    if isinstance(rows, Roster) and rows.scheme.keys == keys:
+        scores = np.frombuffer(rows.scores, dtype=np.float64).reshape(-1, len(keys))
+        masks = np.frombuffer(rows.received, dtype=rows.received.typecode)
+        has_grade = (masks[:, None] >> np.arange(len(keys), dtype=masks.dtype)) & 1 == 1
+        return scores, has_grade
+    rows = list(rows)
+    scores = np.zeros((len(rows), len(keys)))
+    has_grade = np.zeros((len(rows), len(keys)), dtype=bool)
+    for i, components in enumerate(rows):
+        for j, key in enumerate(keys):
+            scores[i, j], has_grade[i, j] = components[key]
+    return scores, has_grade
+
+
+def accumulate_matrix(scores, has_grade, drop_midterm1_if_lower=False, scheme=None, by_component=False):
+    """
+    Vectorized grading.accumulate.
+    Returns (points, total_weight, dropped) arrays of length N, where dropped
+    marks the students for whom a drop rule removed a component. With
+    by_component, dropped is an (N x components) array marking which ones.
+    """
+    scheme = scheme or DEFAULT_SCHEME
+    scores = np.asarray(scores, dtype=float)
+    has_grade = np.asarray(has_grade, dtype=bool)
+    n = len(scores)
+
+    points = np.zeros(n)
+    total_weight = np.zeros(n)
+    # Column by column, in component order, mirrors the scalar accumulation order
+    for j, weight in enumerate(scheme.weights):
+        has = has_grade[:, j]
+        points += np.where(has, scores[:, j] * weight, 0.0)
+        total_weight += np.where(has, weight, 0.0)
+
+    dropped = np.zeros(n, dtype=bool)
+    dropped_columns = {}
+    for rule in scheme.rules:
+        if rule.optional and not drop_midterm1_if_lower:
+            continue
+        score = scores[:, rule.component]
+        other = scores[:, rule.compare_to]
+        weight = scheme.weights[rule.component]
+        fires = has_grade[:, rule.requires].all(axis=1)
+        if rule.component in dropped_columns:
+            fires &= ~dropped_columns[rule.component]
+        if rule.kind == 'drop_if_lower':
+            fires &= score < other
+            points = np.where(fires, points - score * weight, points)
+            total_weight = np.where(fires, total_weight - weight, total_weight)
+            dropped_columns[rule.component] = dropped_columns.get(rule.component, False) | fires
+            dropped |= fires
+        else:  # replace_if_higher
+            fires &= other > score
+            points = np.where(fires, points + (other - score) * weight, points)
+
+    if by_component:
+        dropped = np.zeros(has_grade.shape, dtype=bool)
+        for column, fires in dropped_columns.items():
+            dropped[:, column] = fires
+    return points, total_weight, dropped
+
+
+def percentages(points, total_weight):
+    """Current average on included work, 0 where nothing is graded yet."""
+    graded = total_weight > 0
+    return np.divide(points, total_weight, out=np.zeros_like(points), where=graded)
+
+
+def remaining_weights(total_weight, dropped, scheme=None):
+    """Vectorized grading.remaining_weight, with dropped from accumulate_matrix(by_component=True)."""
+    scheme = scheme or DEFAULT_SCHEME
+    max_possible_weight = np.full(len(total_weight), scheme.total_weight)
+    for j, weight in enumerate(scheme.weights):
+        max_possible_weight = np.where(dropped[:, j], max_possible_weight - weight, max_possible_weight)
+    return max_possible_weight - total_weight
+
+
+def required_averages(points, total_weight, dropped, target_grade, curve_points=0, scheme=None):
+    """
+    Vectorized grading.required_average, with dropped from accumulate_matrix(by_component=True).
+    NaN where nothing is left to grade.
+    """
+    remaining = remaining_weights(total_weight, dropped, scheme)
+    open_work = remaining > WEIGHT_TOLERANCE
+    adjusted_points_needed = (target_grade - points) - curve_points
+    return np.divide(adjusted_points_needed, remaining, out=np.full(len(points), np.nan), where=open_work)
+
+
+def required_average_grids(scores, has_grade, targets, curves, drop_midterm1_if_lower=False, scheme=None, out=None):
+    """
+    Vectorized grading.required_average_grid for every student: an
+    (N x targets x curves) array, NaN where nothing is left to grade.
+    The grids are written into out when given.
+    """
+    points, total_weight, dropped = accumulate_matrix(scores, has_grade, drop_midterm1_if_lower, scheme, by_component=True)
+    remaining = remaining_weights(total_weight, dropped, scheme)[:, None, None]
+    if out is None:
+        out = np.empty((len(points), len(targets), len(curves)))
+    np.subtract(np.asarray(targets, dtype=float)[None, :, None], points[:, None, None], out=out)
+    out -= np.asarray(curves, dtype=float)[None, None, :]
+    np.divide(out, remaining, out=out, where=remaining > WEIGHT_TOLERANCE)
+    out[remaining[:, 0, 0] <= WEIGHT_TOLERANCE] = np.nan
+    return out
+
+
+def calculate_grades_vectorized(scores, has_grade, drop_midterm1_if_lower=False, scheme=None):
+    """
+    Grade a whole score matrix in one pass.
+    Returns (points, total_weight, percentage, dropped) arrays of length N.
+    """
+    points, total_weight, dropped = accumulate_matrix(scores, has_grade, drop_midterm1_if_lower, scheme)
+    return points, total_weight, percentages(points, total_weight), dropped